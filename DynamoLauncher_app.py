@@ -1,6 +1,6 @@
 from PyQt5.QtCore import (
     QThread, pyqtSignal, Qt, QTimer, QRect, QEasingCurve, QPropertyAnimation,
-    QParallelAnimationGroup, QPoint, QSettings
+    QParallelAnimationGroup, QPoint, QSettings, QFileSystemWatcher
 )
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QLineEdit, QComboBox, QSpacerItem,
@@ -9,19 +9,104 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QPixmap, QIcon
 
-from minecraft_launcher_lib.utils import get_minecraft_directory, get_version_list
-from minecraft_launcher_lib.install import install_minecraft_version
-from minecraft_launcher_lib.command import get_minecraft_command
+from DynamoLauncher_common import MANIFEST_URL, get_launcher_directory, get_store_directory
+from DynamoLauncher_download import DownloadEngine
+from DynamoLauncher_store import ContentStore
+from DynamoLauncher_verify import VerifyIndex
+from DynamoLauncher_manifest import ManifestCache, DEFAULT_TTL, mirror_manifest_url
+from DynamoLauncher_manager import LaunchManager, INSTALLING, QUEUED, RUNNING, FAILED, EXITED
+from DynamoLauncher_supervisor import format_summary
+from DynamoLauncher_jvm import PROFILES, DEFAULT_PROFILE
+from DynamoLauncher_versions import InstalledVersions, version_key
+from DynamoLauncher_picker import VersionPicker
+from DynamoLauncher_prefetch import Prefetcher
+from DynamoLauncher_gc import GarbageCollector, parse_size
+from DynamoLauncher_startup import StartupPipeline
+from DynamoLauncher_trace import enable as enable_tracing, save_trace, report as trace_report
 
-from random_username.generate import generate_username
-from uuid import uuid1
-
-from subprocess import Popen, CREATE_NO_WINDOW
 from os.path import join, isdir
-import os
+import importlib
 import sys
+import time
+
+minecraft_directory = get_launcher_directory()
+
+# Heavy modules are imported by the startup pipeline while the splash is showing
+LAZY_MODULES = (
+    'minecraft_launcher_lib.install',
+    'minecraft_launcher_lib.command',
+    'random_username.generate'
+)
 
-minecraft_directory = get_minecraft_directory().replace('minecraft', 'DynamoLauncher')
+def warm_imports():
+    for name in LAZY_MODULES:
+        importlib.import_module(name)
+
+def load_settings():
+    settings = QSettings('TuOrganizacion', 'TuAplicacion')
+    return {
+        'username': settings.value('username', ''),
+        'manifest_ttl': int(settings.value('manifest_ttl', DEFAULT_TTL)),
+        'manifest_stale_while_revalidate': settings.value('manifest_stale_while_revalidate', True, type=bool),
+        'download_workers': int(settings.value('download_workers', 16)),
+        'download_per_host': int(settings.value('download_per_host', 8)),
+        'max_concurrent_installs': int(settings.value('max_concurrent_installs', 2)),
+        # Empty disables the shared content store
+        'content_store': settings.value('content_store', get_store_directory()),
+        # LAN mirror started with `DynamoLauncher_console.py serve`, empty fetches from Mojang
+        'mirror_url': settings.value('mirror_url', ''),
+        # Seconds between CPU/memory samples of a running game
+        'telemetry_interval': float(settings.value('telemetry_interval', 5.0)),
+        'jvm_profile': settings.value('jvm_profile', DEFAULT_PROFILE),
+        # Per-version class-data-sharing archives, built after the first successful launch
+        'class_data_sharing': settings.value('class_data_sharing', True, type=bool),
+        # Size the launcher root may use, such as 20G; 0 never evicts a version
+        'disk_quota': settings.value('disk_quota', '0'),
+        # Chrome trace of startup, installs and launches in launcher_cache/traces/
+        'trace': settings.value('trace', False, type=bool)
+    }
+
+def create_manifest_cache(settings):
+    return ManifestCache(
+        minecraft_directory,
+        url=mirror_manifest_url(settings['mirror_url']) if settings['mirror_url'] else MANIFEST_URL,
+        ttl=settings['manifest_ttl'],
+        stale_while_revalidate=settings['manifest_stale_while_revalidate']
+    )
+
+def warm_manifest():
+    manifest_cache = create_manifest_cache(load_settings())
+    manifest_cache.prefetch()
+    return manifest_cache
+
+def load_installed_versions():
+    installed_versions = InstalledVersions(minecraft_directory).load()
+    # Versions added or deleted while the launcher was closed, one listdir of versions/
+    installed_versions.sync_directory()
+    return installed_versions
+
+class StartupThread(QThread):
+    progress_signal = pyqtSignal(int, int, str)
+
+    def __init__(self, pipeline):
+        super().__init__()
+        self.pipeline = pipeline
+
+    def run(self):
+        self.pipeline.run(on_progress=self.progress_signal.emit)
+
+class GarbageCollectionThread(QThread):
+    result_signal = pyqtSignal(object)
+
+    def __init__(self, collector, quota, dry_run, busy):
+        super().__init__()
+        self.collector = collector
+        self.quota = quota
+        self.dry_run = dry_run
+        self.busy = busy
+
+    def run(self):
+        self.result_signal.emit(self.collector.collect(self.quota, self.dry_run, busy=self.busy))
 
 class SplashScreen(QDialog):
     def __init__(self):
@@ -49,7 +134,7 @@ class SplashScreen(QDialog):
         font.setPointSize(24)  # Adjust the font size according to your needs
         text_label.setFont(font)
 
-        # Configuring the loading bar
+        # Configuring the loading bar, driven by the startup pipeline
         self.progress_bar = QProgressBar(self)
         self.progress_bar.setMinimum(0)
         self.progress_bar.setMaximum(100)
@@ -71,14 +156,6 @@ class SplashScreen(QDialog):
         self.setWindowFlags(Qt.FramelessWindowHint)
         self.setMinimumSize(400, 200)  # You can adjust the size according to your needs
 
-        # Timer to close automatically after 5 seconds
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_progress_bar)
-        self.timer.start(50)  # Update progress bar every 50 milliseconds
-        self.close_timer = QTimer(self)
-        self.close_timer.timeout.connect(self.close)
-        self.close_timer.start(5000)  # Closing SplashScreen after 5 seconds
-
         self.setLayout(main_layout)
 
         # Configure the appearance animation
@@ -98,78 +175,10 @@ class SplashScreen(QDialog):
         # Start appearance animation
         opacity_animation.start()
 
-    def update_progress_bar(self):
-        current_value = self.progress_bar.value()
-        if current_value < 100:
-            self.progress_bar.setValue(current_value + 2)
-            self.start_progress_label.setText(f"Loading: {current_value}%")
-        else:
-            self.timer.stop()
-
-class LaunchThread(QThread):
-    launch_setup_signal = pyqtSignal(str, str)
-    progress_update_signal = pyqtSignal(int, int, str)
-    state_update_signal = pyqtSignal(bool)
-
-    version_id = ''
-    username = ''
-
-    progress = 0
-    progress_max = 0
-    progress_label = ''
-
-    def __init__(self):
-        super().__init__()
-        self.launch_setup_signal.connect(self.launch_setup)
-
-    def launch_setup(self, version_id, username):
-        self.version_id = version_id
-        self.username = username
-
-    def update_progress_label(self, value):
-        self.progress_label = value
-        self.progress_update_signal.emit(self.progress, self.progress_max, self.progress_label)
-
-    def update_progress(self, value):
-        self.progress = value
-        self.progress_update_signal.emit(self.progress, self.progress_max, self.progress_label)
-
-    def update_progress_max(self, value):
-        self.progress_max = value
-        self.progress_update_signal.emit(self.progress, self.progress_max, self.progress_label)
-
-    def run(self):
-        self.state_update_signal.emit(True)
-
-        install_minecraft_version(
-            versionid=self.version_id,
-            minecraft_directory=minecraft_directory,
-            callback={
-                'setStatus': self.update_progress_label,
-                'setProgress': self.update_progress,
-                'setMax': self.update_progress_max
-            }
-        )
-
-        if not self.username:
-            self.username = generate_username()[0]
-
-        options = {
-            'username': self.username,
-            'uuid': str(uuid1()),
-            'token': ''
-        }
-
-        process = Popen(
-            get_minecraft_command(
-                version=self.version_id,
-                minecraft_directory=minecraft_directory,
-                options=options
-            ),
-            creationflags=CREATE_NO_WINDOW
-        )
-        process.wait()
-        self.state_update_signal.emit(False)
+    def update_startup_progress(self, done, total, label):
+        percent = done * 100 // total if total else 100
+        self.progress_bar.setValue(percent)
+        self.start_progress_label.setText(f"Loading: {percent}% ({label})")
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
@@ -182,8 +191,47 @@ class SettingsDialog(QDialog):
         self.dark_mode_checkbox.setChecked(parent.dark_mode)
         self.dark_mode_checkbox.stateChanged.connect(parent.toggle_dark_mode)
 
+        self.disk_usage_label = QLabel(parent.disk_usage_text(), self)
+
+        self.mirror_label = QLabel("LAN mirror URL (applies after restart)", self)
+        self.mirror_edit = QLineEdit(self)
+        self.mirror_edit.setPlaceholderText('http://host:8080')
+        self.mirror_edit.setText(parent.settings['mirror_url'])
+
+        self.jvm_profile_label = QLabel("JVM profile", self)
+        self.jvm_profile_select = QComboBox(self)
+        self.jvm_profile_select.addItems(list(PROFILES))
+        self.jvm_profile_select.setCurrentText(parent.settings['jvm_profile'])
+
+        self.cds_checkbox = QCheckBox("Faster game startup (class data sharing, Java 13+)", self)
+        self.cds_checkbox.setChecked(parent.settings['class_data_sharing'])
+
+        self.trace_checkbox = QCheckBox("Record performance traces (applies after restart)", self)
+        self.trace_checkbox.setChecked(parent.settings['trace'])
+
+        self.quota_label = QLabel("Disk quota, e.g. 20G (0 = no limit)", self)
+        self.quota_label.setWordWrap(True)
+        self.quota_edit = QLineEdit(self)
+        self.quota_edit.setText(parent.settings['disk_quota'])
+
+        self.gc_preview_button = QPushButton("Preview cleanup", self)
+        self.gc_preview_button.clicked.connect(lambda: parent.run_garbage_collection(self.quota_edit.text(), True))
+        self.gc_button = QPushButton("Clean up now", self)
+        self.gc_button.clicked.connect(lambda: parent.run_garbage_collection(self.quota_edit.text(), False))
+
         self.layout = QVBoxLayout(self)
         self.layout.addWidget(self.dark_mode_checkbox)
+        self.layout.addWidget(self.disk_usage_label)
+        self.layout.addWidget(self.mirror_label)
+        self.layout.addWidget(self.mirror_edit)
+        self.layout.addWidget(self.jvm_profile_label)
+        self.layout.addWidget(self.jvm_profile_select)
+        self.layout.addWidget(self.cds_checkbox)
+        self.layout.addWidget(self.trace_checkbox)
+        self.layout.addWidget(self.quota_label)
+        self.layout.addWidget(self.quota_edit)
+        self.layout.addWidget(self.gc_preview_button)
+        self.layout.addWidget(self.gc_button)
 
         self.apply_button = QPushButton("Aplicar", self)
         self.apply_button.clicked.connect(self.apply_changes)
@@ -198,6 +246,20 @@ class SettingsDialog(QDialog):
 
     def apply_changes(self):
         self.save_changes = True
+        settings = QSettings('TuOrganizacion', 'TuAplicacion')
+        settings.setValue('mirror_url', self.mirror_edit.text().strip())
+        # The JVM profile applies to the next launch
+        profile = self.jvm_profile_select.currentText()
+        settings.setValue('jvm_profile', profile)
+        self.parent().settings['jvm_profile'] = profile
+        self.parent().launch_manager.jvm_profile = profile
+        settings.setValue('class_data_sharing', self.cds_checkbox.isChecked())
+        self.parent().settings['class_data_sharing'] = self.cds_checkbox.isChecked()
+        self.parent().launch_manager.class_data_sharing = self.cds_checkbox.isChecked()
+        settings.setValue('trace', self.trace_checkbox.isChecked())
+        self.parent().settings['trace'] = self.trace_checkbox.isChecked()
+        settings.setValue('disk_quota', self.quota_edit.text().strip() or '0')
+        self.parent().settings['disk_quota'] = self.quota_edit.text().strip() or '0'
         self.accept()
 
     def close_dialog(self):
@@ -207,11 +269,24 @@ class SettingsDialog(QDialog):
         self.reject()
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    available_versions_signal = pyqtSignal(list)
+    instance_state_signal = pyqtSignal(object)
+    instance_progress_signal = pyqtSignal(object, int, int, str, str)
+    background_progress_signal = pyqtSignal(object, int, int, str, str)
+    installed_versions_signal = pyqtSignal()
+
+    def __init__(self, startup=None):
         super().__init__()
 
         self.dark_mode = False
 
+        # Results of the startup pipeline, anything missing is loaded here instead
+        if startup is None:
+            startup = {}
+        self.settings = startup.get('settings') or load_settings()
+        self.manifest_cache = startup.get('manifest') or create_manifest_cache(self.settings)
+        self.available_versions_signal.connect(self.populate_available_versions)
+
         self.resize(400, 400)
         self.centralwidget = QWidget(self)
 
@@ -244,15 +319,26 @@ class MainWindow(QMainWindow):
         self.username.setPlaceholderText('Username')
         self.username.setStyleSheet(line_edit_style)
 
-        self.version_select = QComboBox(self.centralwidget)
-        self.version_select.addItem("Available Minecraft Versions")
+        # Filterable, searchable list of every manifest version, rows are created as the view scrolls
+        self.version_picker = VersionPicker(self.centralwidget)
+        self.version_picker.search.setStyleSheet(line_edit_style)
+        self.version_picker.selection_changed.connect(self.available_version_selected)
         self.load_available_versions()
-        self.version_select.setStyleSheet(combo_box_style)
+
+        # Updated from install and launch events on worker threads, queued onto the UI thread
+        self.installed_versions = startup.get('installed-versions') or load_installed_versions()
+        self.installed_versions.on_change = self.installed_versions_signal.emit
+        self.installed_versions_signal.connect(self.populate_downloaded_versions)
+
+        # Catches versions added or deleted by hand, only versions/ itself is listed
+        self.versions_watcher = QFileSystemWatcher(self)
+        self.versions_watcher.directoryChanged.connect(self.versions_directory_changed)
 
         self.downloaded_version_select = QComboBox(self.centralwidget)
         self.downloaded_version_select.addItem("Downloaded Minecraft Versions")
         self.load_downloaded_versions()
         self.downloaded_version_select.setStyleSheet(combo_box_style)
+        self.downloaded_version_select.currentIndexChanged.connect(self.downloaded_version_selected)
 
         self.progress_spacer = QSpacerItem(20, 20, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Minimum)
 
@@ -264,6 +350,14 @@ class MainWindow(QMainWindow):
         self.start_progress.setProperty('value', 24)
         self.start_progress.setVisible(False)
 
+        # Assets still downloading while the game runs
+        self.background_progress_label = QLabel(self.centralwidget)
+        self.background_progress_label.setText('')
+        self.background_progress_label.setVisible(False)
+
+        self.background_progress = QProgressBar(self.centralwidget)
+        self.background_progress.setVisible(False)
+
         self.start_button = QPushButton(self.centralwidget)
         self.start_button.setText('Play')
         self.start_button.clicked.connect(self.launch_game)
@@ -281,17 +375,53 @@ class MainWindow(QMainWindow):
         self.vertical_layout.addWidget(self.logo)
         self.vertical_layout.addItem(self.titlespacer)
         self.vertical_layout.addWidget(self.username)
-        self.vertical_layout.addWidget(self.version_select)
+        self.vertical_layout.addWidget(self.version_picker)
         self.vertical_layout.addWidget(self.downloaded_version_select)
         self.vertical_layout.addItem(self.progress_spacer)
         self.vertical_layout.addWidget(self.start_progress_label)
         self.vertical_layout.addWidget(self.start_progress)
+        self.vertical_layout.addWidget(self.background_progress_label)
+        self.vertical_layout.addWidget(self.background_progress)
         self.vertical_layout.addWidget(self.start_button)
         self.vertical_layout.addWidget(self.history_button)
 
-        self.launch_thread = LaunchThread()
-        self.launch_thread.state_update_signal.connect(self.state_update)
-        self.launch_thread.progress_update_signal.connect(self.update_progress)
+        self.download_engine = DownloadEngine(
+            max_workers=self.settings['download_workers'],
+            per_host=self.settings['download_per_host'],
+            index=VerifyIndex(minecraft_directory),
+            store=ContentStore(self.settings['content_store']) if self.settings['content_store'] else None
+        )
+        # Manager callbacks arrive on worker threads and are queued onto the UI thread
+        self.launch_manager = LaunchManager(
+            minecraft_directory,
+            self.download_engine,
+            manifest_cache=self.manifest_cache,
+            max_installs=self.settings['max_concurrent_installs'],
+            mirror=self.settings['mirror_url'] or None,
+            on_state=self.instance_state_signal.emit,
+            on_progress=self.instance_progress_signal.emit,
+            on_background_progress=self.background_progress_signal.emit,
+            sample_interval=self.settings['telemetry_interval'],
+            jvm_profile=self.settings['jvm_profile'] if self.settings['jvm_profile'] in PROFILES else DEFAULT_PROFILE,
+            class_data_sharing=self.settings['class_data_sharing'],
+            installed_versions=self.installed_versions
+        )
+        # Starts on the selected version while the user is still deciding
+        self.prefetcher = Prefetcher(
+            minecraft_directory,
+            self.download_engine,
+            manifest_cache=self.manifest_cache,
+            mirror=self.settings['mirror_url'] or None,
+            installed_versions=self.installed_versions
+        )
+        self.instance_state_signal.connect(self.state_update)
+        self.instance_progress_signal.connect(self.update_progress)
+        self.background_progress_signal.connect(self.update_background_progress)
+
+        # With a quota set the root is brought under it once per start, off the UI thread
+        self.gc_thread = None
+        if self.settings['disk_quota'].strip() not in ('', '0'):
+            QTimer.singleShot(0, lambda: self.run_garbage_collection(self.settings['disk_quota'], False, quiet=True))
 
         self.setCentralWidget(self.centralwidget)
 
@@ -306,8 +436,7 @@ class MainWindow(QMainWindow):
         self.settings_menu.addAction(self.open_settings_action)
 
     def load_username(self):
-        settings = QSettings('TuOrganizacion', 'TuAplicacion')
-        saved_username = settings.value('username', '')
+        saved_username = self.settings['username']
         if saved_username:
             self.username.setText(saved_username)
 
@@ -325,66 +454,114 @@ class MainWindow(QMainWindow):
         message_box.setText("Usernames used:\n" + history_text)
         message_box.exec_()
 
-    def state_update(self, value):
-        self.start_button.setDisabled(value)
-        self.start_progress_label.setVisible(value)
-        self.start_progress.setVisible(value)
+    def state_update(self, instance):
+        busy = bool(self.launch_manager.instances_in(QUEUED, INSTALLING))
+        self.start_progress_label.setVisible(busy)
+        self.start_progress.setVisible(busy)
 
-    def update_progress(self, progress, max_progress, label):
-        self.start_progress.setValue(progress)
+        background = bool(self.launch_manager.background_downloads())
+        self.background_progress_label.setVisible(background)
+        self.background_progress.setVisible(background)
+
+        if instance.state in (RUNNING, FAILED):
+            trace_path = save_trace(minecraft_directory, f'{instance.version_id}-{instance.id}')
+            if trace_path is not None:
+                self.statusBar().showMessage(f"Trace saved to {trace_path}")
+
+        if instance.state == FAILED:
+            QMessageBox.warning(self, "Warning", f"Could not launch {instance.version_id}: {instance.error}")
+        elif instance.state == EXITED and instance.telemetry is not None:
+            self.statusBar().showMessage(f"{instance.version_id}: {format_summary(instance.telemetry)}")
+
+    def update_progress(self, instance, progress, max_progress, label, stats):
         self.start_progress.setMaximum(max_progress)
-        self.start_progress_label.setText(label)
+        self.start_progress.setValue(progress)
+        label = f"{instance.version_id}: {label}"
+        self.start_progress_label.setText(f"{label} ({stats})" if stats else label)
+
+    def update_background_progress(self, instance, progress, max_progress, label, stats):
+        background = bool(self.launch_manager.background_downloads())
+        self.background_progress_label.setVisible(background)
+        self.background_progress.setVisible(background)
+        self.background_progress.setMaximum(max_progress)
+        self.background_progress.setValue(progress)
+        label = f"{instance.version_id}: {label}"
+        self.background_progress_label.setText(f"{label} ({stats})" if stats else label)
 
     def load_available_versions(self):
-        available_versions = sorted(
-            [version['id'] for version in get_version_list() if
-             'snapshot' not in version['type'].lower() and
-             'pre' not in version['type'].lower() and
-             'alpha' not in version['type'].lower() and
-             'beta' not in version['type'].lower()],
-            key=self.version_sort_key
-        )
-
-        self.version_select.clear()
-        self.version_select.addItem("Available Minecraft Versions")
-        self.version_select.addItems(available_versions)
+        # Fills instantly from the on-disk cache, a background refresh re-populates it
+        versions = self.manifest_cache.get_version_list(on_update=self.available_versions_signal.emit)
+        self.populate_available_versions(versions)
+
+    def populate_available_versions(self, versions):
+        self.version_picker.set_versions(versions)
+
+    def available_version_selected(self, version_id):
+        # Only one of the two lists holds the version Play launches
+        if version_id:
+            self.downloaded_version_select.setCurrentIndex(0)
+        self.prefetcher.select(self.selected_version())
+
+    def downloaded_version_selected(self, index):
+        if index > 0:
+            self.version_picker.clear_selection()
+        self.prefetcher.select(self.selected_version())
+
+    def selected_version(self):
+        if self.version_picker.selected_version() is not None:
+            return self.version_picker.selected_version()
+        if self.downloaded_version_select.currentIndex() > 0:
+            return self.downloaded_version_select.currentText()
+        return None
 
     def load_downloaded_versions(self):
         versions_folder = join(minecraft_directory, 'versions')
-
-        try:
-            downloaded_versions = sorted([f for f in os.listdir(versions_folder) if isdir(join(versions_folder, f))],
-                                         key=self.version_sort_key)
-        except FileNotFoundError:
+        # A headless benchmark run has nobody to close the dialog
+        if not isdir(versions_folder) and '--exit-after-startup' not in sys.argv:
             QMessageBox.warning(self, "Warning",
                                 "Minecraft versions folder not found. Make sure DynamoLauncher is set up correctly.")
-            return
+        self.populate_downloaded_versions()
 
+    def populate_downloaded_versions(self):
+        # Only complete versions are listed, one appears as soon as its background assets finish
+        downloaded_versions = sorted(self.installed_versions.complete_versions(), key=version_key)
+
+        selected = self.downloaded_version_select.currentText()
         self.downloaded_version_select.clear()
         self.downloaded_version_select.addItem("Downloaded Minecraft Versions")
         self.downloaded_version_select.addItems(downloaded_versions)
+        if selected in downloaded_versions:
+            self.downloaded_version_select.setCurrentText(selected)
+        self.watch_versions_directory()
 
-    def version_sort_key(self, version):
-        try:
-            return tuple(map(int, version.split('.')))
-        except ValueError:
-            return tuple()
+    def watch_versions_directory(self):
+        versions_folder = join(minecraft_directory, 'versions')
+        if isdir(versions_folder) and versions_folder not in self.versions_watcher.directories():
+            self.versions_watcher.addPath(versions_folder)
+
+    def versions_directory_changed(self, path):
+        self.installed_versions.sync_directory()
+        self.watch_versions_directory()
 
     def launch_game(self):
         self.save_username()
 
-        selected_version = None
-        if self.version_select.currentIndex() > 0:
-            selected_version = self.version_select.currentText()
-        elif self.downloaded_version_select.currentIndex() > 0:
-            selected_version = self.downloaded_version_select.currentText()
-
+        selected_version = self.selected_version()
         if selected_version is None:
             QMessageBox.warning(self, "Warning", "Please select a Minecraft version.")
             return
+        if self.gc_thread is not None and self.gc_thread.isRunning() and not self.gc_thread.dry_run:
+            # An install now could reuse files the cleanup is about to delete
+            self.statusBar().showMessage("Disk cleanup is running, press Play again when it finishes")
+            return
 
-        self.launch_thread.launch_setup_signal.emit(selected_version, self.username.text())
-        self.launch_thread.start()
+        # The install picks up every file the prefetcher already has in place
+        prefetch = self.prefetcher.claim(selected_version)
+        if prefetch is not None and prefetch['files']:
+            self.statusBar().showMessage(
+                f"{selected_version}: {prefetch['files_done']}/{prefetch['files']} launch files ready before Play "
+                f"({prefetch['bytes_fetched'] / 1e6:.1f} MB prefetched in {prefetch['seconds']:.1f}s)")
+        self.launch_manager.submit(selected_version, self.username.text(), prefetch=prefetch)
 
     def apply_button_style(self, button):
         button_style = (
@@ -405,6 +582,59 @@ class MainWindow(QMainWindow):
         )
         button.setStyleSheet(button_style)
 
+    def disk_usage_text(self):
+        store = self.download_engine.store
+        if store is None:
+            return "Shared content store disabled"
+        usage = store.usage(minecraft_directory)
+        return (f"Disk usage: {usage['bytes'] / 1e6:.0f} MB in {usage['files']} files\n"
+                f"Shared with other roots: {usage['shared_bytes'] / 1e6:.0f} MB")
+
+    def run_garbage_collection(self, quota_text, dry_run, quiet=False):
+        try:
+            quota = parse_size(quota_text)
+        except ValueError:
+            QMessageBox.warning(self, "Warning", f"Invalid disk quota: {quota_text}")
+            return
+        if self.gc_thread is not None and self.gc_thread.isRunning():
+            return
+
+        # Nothing a queued, installing or running game needs is evicted, asked again before each eviction
+        def busy():
+            instances = self.launch_manager.instances_in(QUEUED, INSTALLING, RUNNING) + \
+                self.launch_manager.background_downloads()
+            return {instance.version_id for instance in instances}
+
+        collector = GarbageCollector(
+            minecraft_directory,
+            self.installed_versions,
+            verify_index=self.download_engine.index,
+            store=self.download_engine.store
+        )
+        self.gc_thread = GarbageCollectionThread(collector, quota, dry_run, busy)
+        self.gc_thread.result_signal.connect(
+            lambda report: self.garbage_collection_done(report, quiet))
+        self.gc_thread.start()
+
+    def garbage_collection_done(self, report, quiet):
+        action = "Would free" if report['dry_run'] else "Freed"
+        text = (f"{action} {(report['orphan_bytes'] + report['evicted_bytes']) / 1e6:.0f} MB: "
+                f"{report['orphan_files']} orphaned files, "
+                f"{len(report['evicted'])} versions ({', '.join(entry['version'] for entry in report['evicted']) or 'none'})")
+        if report['unresolved']:
+            text += f"\nSkipped orphan removal, could not read: {', '.join(report['unresolved'])}"
+        if quiet:
+            self.statusBar().showMessage(text)
+        else:
+            QMessageBox.information(self, "Disk cleanup", text)
+
+    def closeEvent(self, event):
+        self.prefetcher.cancel()
+        self.launch_manager.shutdown()
+        if save_trace(minecraft_directory, 'session') is not None and '--trace' in sys.argv:
+            print(trace_report())
+        super().closeEvent(event)
+
     def open_settings_dialog(self):
         settings_dialog = SettingsDialog(self)
         settings_dialog.exec_()
@@ -427,18 +657,51 @@ class MainWindow(QMainWindow):
         self.centralwidget.setStyleSheet(dark_mode_style if self.dark_mode else light_mode_style)
 
 def main():
+    startup_profile = '--startup-profile' in sys.argv
+    if '--trace' in sys.argv or QSettings('TuOrganizacion', 'TuAplicacion').value('trace', False, type=bool):
+        enable_tracing()
+    pipeline = StartupPipeline()
+
+    start = time.perf_counter()
     QApplication.setAttribute(Qt.ApplicationAttribute.AA_EnableHighDpiScaling, True)
 
     app = QApplication([])
     app.setStyle('Fusion')  # Use Fusion style
+    pipeline.mark('qt-init', start)
+
+    pipeline.add('imports', warm_imports, weight=2)
+    pipeline.add('manifest', warm_manifest)
+    pipeline.add('installed-versions', load_installed_versions)
+    pipeline.add('settings', load_settings)
 
-    # Display the welcome screen
+    # Display the welcome screen until the warm-up tasks are done
+    start = time.perf_counter()
     splash_screen = SplashScreen()
     splash_screen.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
+    startup_thread = StartupThread(pipeline)
+    startup_thread.progress_signal.connect(splash_screen.update_startup_progress)
+    startup_thread.finished.connect(splash_screen.accept)
+    startup_thread.start()
     splash_screen.exec_()  # Utiliza exec_() en lugar de show()
+    startup_thread.wait()
+    pipeline.mark('splash', start)
 
-    window = MainWindow()
+    start = time.perf_counter()
+    window = MainWindow(pipeline.results)
     window.showMaximized()
+    pipeline.mark('main-window', start)
+
+    if startup_profile:
+        def print_startup_profile():
+            # First event loop iteration after show: the window is interactive
+            pipeline.mark('time-to-interactive', pipeline.origin)
+            print(pipeline.report(), flush=True)
+            if '--exit-after-startup' in sys.argv:
+                # Used by `DynamoLauncher_bench.py suite` to time startups headless
+                window.close()
+
+        QTimer.singleShot(0, print_startup_profile)
+
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
@@ -0,0 +1,576 @@
+# Benchmarks for launcher hot paths, run against local stand-in servers only:
+#   python DynamoLauncher_bench.py download --objects 2000 --latency 0.005
+#   python DynamoLauncher_bench.py progress --files 10000
+#   python DynamoLauncher_bench.py jvm --seconds 20 --runs 3
+#   python DynamoLauncher_bench.py suite --output bench.json --latency 0.02 --bandwidth 20M
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from os.path import join, dirname, isfile, abspath
+from urllib.request import urlopen
+
+from DynamoLauncher_download import DownloadEngine, DownloadJob
+from DynamoLauncher_fakeserver import FakeServer, add_synthetic_assets, add_synthetic_version, make_manifest
+from DynamoLauncher_gc import parse_size
+from DynamoLauncher_install import install_version
+from DynamoLauncher_jvm import PROFILES, jvm_arguments
+from DynamoLauncher_manifest import ManifestCache, mirror_manifest_url
+from DynamoLauncher_progress import ProgressAggregator
+from DynamoLauncher_supervisor import GameSupervisor, parse_gc_pause
+from DynamoLauncher_verify import VerifyIndex
+from DynamoLauncher_versions import InstalledVersions, VersionIndex
+
+SUITE_VERSION = 'bench-1.0'
+SUITE_BENCHMARKS = ('manifest', 'installed-versions', 'install', 'play', 'startup')
+
+# Stand-in for java on PATH: answers like the game does and exits at once
+STUB_JAVA = '''#!/bin/sh
+echo "Setting user: bench"
+exit 0
+'''
+
+# Stand-in for the game: chunk-like long-lived data replaced at random plus a
+# steady stream of short-lived garbage. Prints "ready" once main() is reached.
+JVM_WORKLOAD = '''
+import java.util.HashMap;
+import java.util.Map;
+import java.util.Random;
+
+public class Workload {
+    public static void main(String[] args) {
+        System.out.println("ready");
+        long end = System.nanoTime() + Long.parseLong(args[0]) * 1000000L;
+        Map<Integer, byte[]> live = new HashMap<>();
+        Random random = new Random(1);
+        long checksum = 0;
+        while (System.nanoTime() < end) {
+            live.put(random.nextInt(Integer.parseInt(args[1])), new byte[16 * 1024]);
+            for (int i = 0; i < 64; i++) {
+                checksum += new int[64].length + String.valueOf(i).length();
+            }
+        }
+        System.out.println("done " + checksum + " " + live.size());
+    }
+}
+'''
+
+
+def asset_jobs(server, index, root):
+    jobs = []
+    for item in index['objects'].values():
+        object_hash = item['hash']
+        jobs.append(DownloadJob(
+            f'{server.url}/objects/{object_hash[:2]}/{object_hash}',
+            join(root, 'assets', 'objects', object_hash[:2], object_hash),
+            object_hash,
+            item['size']
+        ))
+    return jobs
+
+
+def sequential_download(jobs):
+    # What install_minecraft_version does today: one file after another
+    for job in jobs:
+        os.makedirs(dirname(job.path), exist_ok=True)
+        with urlopen(job.url) as response, open(job.path, 'wb') as f:
+            shutil.copyfileobj(response, f)
+
+
+def bench_download(args):
+    results = {'objects': args.objects, 'size': args.size, 'latency': args.latency, 'runs': {}}
+    with FakeServer(latency=args.latency) as server:
+        index = add_synthetic_assets(server, args.objects, args.size)
+        total_bytes = args.objects * args.size
+
+        def measure(name, func):
+            root = tempfile.mkdtemp(prefix='dynamo-bench-')
+            try:
+                jobs = asset_jobs(server, index, root)
+                start = time.perf_counter()
+                func(jobs)
+                elapsed = time.perf_counter() - start
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+            results['runs'][name] = {
+                'seconds': round(elapsed, 3),
+                'files_per_second': round(len(jobs) / elapsed, 1),
+                'mb_per_second': round(total_bytes / elapsed / 1e6, 2)
+            }
+
+        def engine_run(workers, per_host):
+            def run(jobs):
+                engine = DownloadEngine(max_workers=workers, per_host=per_host)
+                try:
+                    engine.download(jobs)
+                finally:
+                    engine.close()
+            return run
+
+        measure('sequential', sequential_download)
+        measure('engine-1', engine_run(1, 1))
+        measure(f'engine-{args.workers}', engine_run(args.workers, args.per_host))
+
+    print(json.dumps(results, indent=2))
+    return results
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        'mean': round(sum(values) / len(values) * 1000, 2),
+        'p50': round(values[len(values) // 2] * 1000, 2),
+        'p99': round(values[min(len(values) - 1, len(values) * 99 // 100)] * 1000, 2),
+        'max': round(values[-1] * 1000, 2)
+    }
+
+
+def bench_progress(args):
+    # Event-loop latency while a worker thread reports a simulated install,
+    # once emitting a signal per callback and once through ProgressAggregator
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtCore import QThread, QTimer, pyqtSignal
+    from PyQt5.QtWidgets import QApplication, QLabel, QProgressBar
+
+    app = QApplication.instance() or QApplication([])
+
+    class SimulatedInstall(QThread):
+        progress_update_signal = pyqtSignal(int, int, str, str)
+
+        def __init__(self, aggregated):
+            super().__init__()
+            self.aggregated = aggregated
+
+        def run(self):
+            if self.aggregated:
+                aggregator = ProgressAggregator(self.progress_update_signal.emit)
+                aggregator.start()
+                callback = aggregator.callback()
+            else:
+                state = {'progress': 0, 'max': 0, 'label': ''}
+
+                def update(name):
+                    def setter(value):
+                        state[name] = value
+                        self.progress_update_signal.emit(state['progress'], state['max'], state['label'], '')
+                    return setter
+
+                callback = {'setStatus': update('label'), 'setProgress': update('progress'), 'setMax': update('max')}
+
+            callback['setStatus']('Installing assets')
+            callback['setMax'](args.files)
+            for i in range(args.files):
+                if args.file_time:
+                    time.sleep(args.file_time)
+                callback['setProgress'](i + 1)
+                callback.get('addBytes', lambda value: None)(args.size)
+
+            if self.aggregated:
+                aggregator.stop()
+
+    def measure(aggregated):
+        progress_bar = QProgressBar()
+        progress_label = QLabel()
+        progress_bar.show()
+        progress_label.show()
+        updates = 0
+
+        def update_progress(progress, max_progress, label, stats):
+            nonlocal updates
+            updates += 1
+            progress_bar.setMaximum(max_progress)
+            progress_bar.setValue(progress)
+            progress_label.setText(f'{label} ({stats})' if stats else label)
+
+        lateness = []
+        interval = args.probe_interval
+        expected = time.perf_counter() + interval
+
+        def probe():
+            nonlocal expected
+            now = time.perf_counter()
+            lateness.append(max(0.0, now - expected))
+            expected = now + interval
+
+        timer = QTimer()
+        timer.setInterval(int(interval * 1000))
+        timer.timeout.connect(probe)
+
+        worker = SimulatedInstall(aggregated)
+        worker.progress_update_signal.connect(update_progress)
+        # finished is queued behind every pending progress signal, so quitting
+        # on it also measures how long the backlog takes to drain
+        worker.finished.connect(app.quit)
+
+        start = time.perf_counter()
+        timer.start()
+        worker.start()
+        app.exec_()
+        timer.stop()
+        worker.wait()
+        elapsed = time.perf_counter() - start
+
+        return {'ui_updates': updates, 'seconds': round(elapsed, 3), 'event_loop_latency_ms': percentiles(lateness)}
+
+    results = {
+        'files': args.files,
+        'direct': measure(False),
+        'aggregated': measure(True)
+    }
+    print(json.dumps(results, indent=2))
+    return results
+
+
+def find_jdk_tool(name):
+    java_home = os.environ.get('JAVA_HOME')
+    if java_home:
+        for candidate in (join(java_home, 'bin', name), join(java_home, 'bin', f'{name}.exe')):
+            if isfile(candidate):
+                return candidate
+    return shutil.which(name)
+
+
+def bench_jvm(args):
+    # Startup (launch to first line) and GC pauses of the workload under each profile
+    java, javac = find_jdk_tool('java'), find_jdk_tool('javac')
+    if java is None or javac is None:
+        print(json.dumps({'error': 'no JDK found, set JAVA_HOME or put java and javac on PATH'}))
+        return None
+
+    profiles = args.profile or list(PROFILES)
+    results = {'seconds': args.seconds, 'live_chunks': args.live_chunks, 'runs': args.runs, 'profiles': {}}
+    root = tempfile.mkdtemp(prefix='dynamo-bench-jvm-')
+    try:
+        with open(join(root, 'Workload.java'), 'w') as f:
+            f.write(JVM_WORKLOAD)
+        subprocess.run([javac, '-d', root, join(root, 'Workload.java')], check=True)
+
+        for profile in profiles:
+            startups, pauses, peak_rss = [], [], 0
+            for run in range(args.runs):
+                log_path = join(root, f'{profile}-{run}.log')
+                supervisor = GameSupervisor(
+                    [java] + jvm_arguments(profile) + ['-cp', root, 'Workload', str(args.seconds * 1000),
+                                                       str(args.live_chunks)],
+                    log_path,
+                    sample_interval=0.5
+                ).start()
+                supervisor.wait()
+                summary = supervisor.finish()
+                if summary['first_output_seconds'] is not None:
+                    startups.append(summary['first_output_seconds'])
+                peak_rss = max(peak_rss, summary['peak_rss'])
+                with open(log_path, 'rb') as f:
+                    pauses.extend(pause / 1000 for pause in map(parse_gc_pause, f) if pause is not None)
+
+            results['profiles'][profile] = {
+                'arguments': jvm_arguments(profile),
+                'startup_ms': percentiles(startups),
+                'gc_pauses_per_run': round(len(pauses) / args.runs, 1),
+                'gc_pause_ms': percentiles(pauses),
+                'gc_pause_total_ms_per_run': round(sum(pauses) * 1000 / args.runs, 1),
+                'peak_rss_mb': round(peak_rss / 2 ** 20)
+            }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(json.dumps(results, indent=2))
+    return results
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def bench_manifest(server, args):
+    # Cold: empty launcher root, the manifest comes over the wire. Warm: a new
+    # cache object on the same root, answered from disk.
+    cold, warm, index_build, index_filter = [], [], [], []
+    for _ in range(args.runs):
+        root = tempfile.mkdtemp(prefix='dynamo-bench-')
+        try:
+            url = mirror_manifest_url(server.url)
+            seconds, _ = timed(lambda: ManifestCache(root, url=url).get_version_list())
+            cold.append(seconds)
+            seconds, versions = timed(lambda: ManifestCache(root, url=url).get_version_list())
+            warm.append(seconds)
+            seconds, version_index = timed(lambda: VersionIndex(versions))
+            index_build.append(seconds)
+            seconds, _ = timed(lambda: version_index.filter(['release'], '1.1'))
+            index_filter.append(seconds)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    return {
+        'versions': args.manifest_versions,
+        'cold_ms': percentiles(cold),
+        'warm_ms': percentiles(warm),
+        'version_index_build_ms': percentiles(index_build),
+        'version_index_filter_ms': percentiles(index_filter)
+    }
+
+
+def bench_installed_versions(server, args):
+    # First load imports versions/ into the index, later loads only read the index
+    first, warm, sync = [], [], []
+    for _ in range(args.runs):
+        root = tempfile.mkdtemp(prefix='dynamo-bench-')
+        try:
+            for i in range(args.installed):
+                directory = join(root, 'versions', f'1.{i}')
+                os.makedirs(directory)
+                for name in (f'1.{i}.json', f'1.{i}.jar'):
+                    with open(join(directory, name), 'wb') as f:
+                        f.write(b'{}')
+            seconds, _ = timed(lambda: InstalledVersions(root).load())
+            first.append(seconds)
+            installed_versions = InstalledVersions(root)
+            seconds, _ = timed(installed_versions.load)
+            warm.append(seconds)
+            seconds, _ = timed(installed_versions.sync_directory)
+            sync.append(seconds)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    return {
+        'installed': args.installed,
+        'first_load_ms': percentiles(first),
+        'warm_load_ms': percentiles(warm),
+        'sync_directory_ms': percentiles(sync)
+    }
+
+
+def install_bench_version(root, server, args, engine):
+    manifest_cache = ManifestCache(root, url=mirror_manifest_url(server.url))
+    start = time.perf_counter()
+    plan = install_version(SUITE_VERSION, root, engine, manifest_cache=manifest_cache, mirror=server.url)
+    launchable = time.perf_counter() - start
+    if plan.background is not None:
+        plan.background.wait()
+    return plan, launchable, time.perf_counter() - start, manifest_cache
+
+
+def bench_install(server, args):
+    runs = []
+    for _ in range(args.runs):
+        root = tempfile.mkdtemp(prefix='dynamo-bench-')
+        engine = DownloadEngine(max_workers=args.workers, per_host=args.per_host, index=VerifyIndex(root))
+        try:
+            plan, launchable, total, manifest_cache = install_bench_version(root, server, args, engine)
+            # Everything is on disk: a repair pass checks every file against the verify index
+            verify, _ = timed(lambda: install_version(SUITE_VERSION, root, engine, manifest_cache=manifest_cache,
+                                                      mirror=server.url, repair=True).background.wait())
+            # And an install of a complete version only stats the version JSON
+            complete, _ = timed(lambda: install_version(SUITE_VERSION, root, engine, manifest_cache=manifest_cache))
+            runs.append({
+                'files': len(plan.jobs),
+                'bytes': plan.total_size,
+                'launchable_seconds': round(launchable, 3),
+                'seconds': round(total, 3),
+                'files_per_second': round(len(plan.jobs) / total, 1),
+                'mb_per_second': round(plan.total_size / total / 1e6, 2),
+                'repair_seconds': round(verify, 3),
+                'already_complete_ms': round(complete * 1000, 2)
+            })
+        finally:
+            engine.close()
+            shutil.rmtree(root, ignore_errors=True)
+    return {'workers': args.workers, 'per_host': args.per_host, 'runs': runs}
+
+
+def bench_play(server, args):
+    # Play pressed to the game process spawned (RUNNING), with a stub java on PATH.
+    # The first launch builds the command, later ones reuse the cached launch plan.
+    from DynamoLauncher_manager import LaunchManager, RUNNING, FAILED
+
+    root = tempfile.mkdtemp(prefix='dynamo-bench-')
+    stub_directory = join(root, 'bin')
+    os.makedirs(stub_directory)
+    with open(join(stub_directory, 'java'), 'w') as f:
+        f.write(STUB_JAVA)
+    os.chmod(join(stub_directory, 'java'), 0o755)
+    path = os.environ.get('PATH', '')
+    os.environ['PATH'] = stub_directory + os.pathsep + path
+
+    engine = DownloadEngine(max_workers=args.workers, per_host=args.per_host, index=VerifyIndex(root))
+    manager = None
+    try:
+        _, _, _, manifest_cache = install_bench_version(root, server, args, engine)
+        # instance id -> perf_counter() when it reached RUNNING or FAILED
+        reached = {}
+        condition = threading.Condition()
+
+        def on_state(instance):
+            if instance.state in (RUNNING, FAILED):
+                with condition:
+                    reached.setdefault(instance.id, time.perf_counter())
+                    condition.notify_all()
+
+        manager = LaunchManager(root, engine, manifest_cache=manifest_cache, mirror=server.url, on_state=on_state,
+                                class_data_sharing=False)
+        launches = []
+        for _ in range(args.runs + 1):
+            start = time.perf_counter()
+            instance = manager.submit(SUITE_VERSION, 'bench')
+            with condition:
+                if not condition.wait_for(lambda: instance.id in reached, timeout=60):
+                    raise RuntimeError('the launch did not start within 60 seconds')
+            if instance.state == FAILED:
+                raise RuntimeError(f'launch failed: {instance.error}')
+            launches.append(reached[instance.id] - start)
+            instance.supervisor.wait()
+        return {'cold_ms': round(launches[0] * 1000, 2), 'warm_ms': percentiles(launches[1:])}
+    finally:
+        os.environ['PATH'] = path
+        if manager is not None:
+            manager.shutdown()
+        engine.close()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def run_app(home, server):
+    # One headless launcher start; returns (process seconds, time-to-interactive ms)
+    config = join(home, '.config', 'TuOrganizacion')
+    os.makedirs(config, exist_ok=True)
+    with open(join(config, 'TuAplicacion.conf'), 'w') as f:
+        f.write(f'[General]\nmirror_url={server.url}\n')
+    # The launcher root of this HOME, set up the way a real installation is
+    os.makedirs(join(home, '.DynamoLauncher', 'versions'), exist_ok=True)
+    env = dict(os.environ, HOME=home, XDG_CONFIG_HOME=join(home, '.config'), QT_QPA_PLATFORM='offscreen')
+    app_directory = dirname(abspath(__file__))
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, join(app_directory, 'DynamoLauncher_app.py'), '--startup-profile', '--exit-after-startup'],
+        cwd=app_directory, env=env, capture_output=True, text=True, timeout=120
+    )
+    seconds = time.perf_counter() - start
+    for line in result.stdout.splitlines():
+        fields = line.split()
+        if fields and fields[0] == 'time-to-interactive':
+            return seconds, float(fields[-1])
+    raise RuntimeError(f'no startup profile in the output: {result.stderr.strip()[-500:]}')
+
+
+def bench_startup(server, args):
+    # Cold: a new launcher root without caches (the OS file cache stays warm).
+    # Warm: the same root started again.
+    cold, warm = {'process': [], 'interactive': []}, {'process': [], 'interactive': []}
+    for _ in range(args.runs):
+        home = tempfile.mkdtemp(prefix='dynamo-bench-home-')
+        try:
+            for measurements in (cold, warm):
+                seconds, interactive_ms = run_app(home, server)
+                measurements['process'].append(seconds)
+                measurements['interactive'].append(interactive_ms / 1000)
+        finally:
+            shutil.rmtree(home, ignore_errors=True)
+    return {
+        'cold_process_ms': percentiles(cold['process']),
+        'cold_interactive_ms': percentiles(cold['interactive']),
+        'warm_process_ms': percentiles(warm['process']),
+        'warm_interactive_ms': percentiles(warm['interactive'])
+    }
+
+
+def git_revision():
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=dirname(abspath(__file__)), capture_output=True,
+                                text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def bench_suite(args):
+    # Every benchmark runs against the local stand-in only; one that can not run
+    # here (no Qt, no minecraft_launcher_lib) records its error and the rest go on
+    benchmarks = {
+        'manifest': bench_manifest,
+        'installed-versions': bench_installed_versions,
+        'install': bench_install,
+        'play': bench_play,
+        'startup': bench_startup
+    }
+    results = {
+        'created': int(time.time()),
+        'revision': git_revision(),
+        'machine': {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()},
+        'config': {name: value for name, value in vars(args).items() if name not in ('func', 'output')},
+        'results': {}
+    }
+    with FakeServer(latency=args.latency, bandwidth=parse_size(args.bandwidth) or None) as server:
+        manifest = make_manifest(args.manifest_versions)
+        manifest['versions'].insert(0, add_synthetic_version(
+            server, SUITE_VERSION, libraries=args.libraries, objects=args.objects, size=args.size,
+            mirror_layout=True))
+        server.set_manifest(manifest)
+
+        for name in args.only or SUITE_BENCHMARKS:
+            print(f'running {name}', file=sys.stderr, flush=True)
+            try:
+                results['results'][name] = benchmarks[name](server, args)
+            except Exception as e:
+                results['results'][name] = {'error': f'{type(e).__name__}: {e}'}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DynamoLauncher benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    download = subparsers.add_parser('download', help='sequential vs pooled asset downloads')
+    download.add_argument('--objects', type=int, default=2000)
+    download.add_argument('--size', type=int, default=8192)
+    download.add_argument('--latency', type=float, default=0.005, help='seconds added to every response')
+    download.add_argument('--workers', type=int, default=16)
+    download.add_argument('--per-host', type=int, default=8)
+    download.set_defaults(func=bench_download)
+
+    progress = subparsers.add_parser('progress', help='event-loop latency during a simulated install')
+    progress.add_argument('--files', type=int, default=10000)
+    progress.add_argument('--size', type=int, default=20000, help='bytes reported per file')
+    progress.add_argument('--file-time', type=float, default=0.0001, help='seconds spent per simulated file')
+    progress.add_argument('--probe-interval', type=float, default=0.005)
+    progress.set_defaults(func=bench_progress)
+
+    jvm = subparsers.add_parser('jvm', help='startup time and GC pauses per JVM profile, needs a local JDK')
+    jvm.add_argument('--profile', action='append', choices=list(PROFILES), help='profile to run (repeatable)')
+    jvm.add_argument('--seconds', type=int, default=20, help='workload run time')
+    jvm.add_argument('--live-chunks', type=int, default=20000, help='16 KB objects kept alive')
+    jvm.add_argument('--runs', type=int, default=3)
+    jvm.set_defaults(func=bench_jvm)
+
+    suite = subparsers.add_parser('suite', help='launcher hot paths against a local fake mirror, results as JSON')
+    suite.add_argument('--output', help='also write the results to this JSON file')
+    suite.add_argument('--only', action='append', choices=SUITE_BENCHMARKS, help='benchmark to run (repeatable)')
+    suite.add_argument('--runs', type=int, default=3)
+    suite.add_argument('--manifest-versions', type=int, default=800, help='versions in the synthetic manifest')
+    suite.add_argument('--installed', type=int, default=200, help='version directories for the scan benchmark')
+    suite.add_argument('--libraries', type=int, default=40)
+    suite.add_argument('--objects', type=int, default=2000, help='asset objects of the synthetic version')
+    suite.add_argument('--size', type=int, default=8192, help='bytes per library and asset object')
+    suite.add_argument('--latency', type=float, default=0.005, help='seconds added to every response')
+    suite.add_argument('--bandwidth', default='0', help='shared link speed in bytes per second, such as 20M; 0 is unlimited')
+    suite.add_argument('--workers', type=int, default=16)
+    suite.add_argument('--per-host', type=int, default=8)
+    suite.set_defaults(func=bench_suite)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+# Single-file version bundles for provisioning machines without network access.
+# Layout: a fixed header, the raw bytes of every file back to back, then a JSON
+# manifest with the offset, size and sha1 of each entry. Files are stored
+# uncompressed (jars, sounds and textures already are compressed), so import
+# maps the bundle and writes each missing entry straight from the mapping.
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join, isfile, isdir, getsize, relpath, abspath, normpath, dirname
+
+from DynamoLauncher_common import read_json
+from DynamoLauncher_download import CHUNK_SIZE, file_sha1
+from DynamoLauncher_gc import scan_files
+from DynamoLauncher_install import InstallPlanner, version_json_paths
+
+MAGIC = b'DYNBNDL1'
+# magic, manifest offset, manifest size
+HEADER = struct.Struct('<8sQQ')
+FORMAT_VERSION = 1
+
+# Per-machine state kept next to a version (it holds this root's absolute paths),
+# rebuilt on the target machine
+EXCLUDED_SUFFIXES = ('.jsa', '.jsa.json', '.tmp', '.part', 'launch_timings.json', 'launch_plan.json')
+
+
+class BundleError(Exception):
+    pass
+
+
+def bundle_files(minecraft_directory, version_id):
+    # {path: sha1 or None} of everything the installed version needs to launch offline
+    plan = InstallPlanner(minecraft_directory, None).plan(version_id)
+    files = {job.path: job.sha1 for job in plan.jobs}
+    directories = [join(minecraft_directory, 'versions', chain_version_id) for chain_version_id in plan.chain]
+    for path in version_json_paths(minecraft_directory, plan.chain):
+        asset_index = read_json(path, {}).get('assetIndex')
+        if asset_index is None:
+            continue
+        files[join(minecraft_directory, 'assets', 'indexes', f"{asset_index['id']}.json")] = asset_index.get('sha1')
+        if plan.legacy_assets:
+            directories.append(join(minecraft_directory, 'assets', 'virtual', asset_index['id']))
+    if plan.legacy_assets:
+        directories.append(join(minecraft_directory, 'resources'))
+    if plan.java_component is not None:
+        directories.append(join(minecraft_directory, 'runtime', plan.java_component))
+
+    for path, _ in scan_files([directory for directory in directories if isdir(directory)]):
+        if not path.endswith(EXCLUDED_SUFFIXES):
+            files.setdefault(path, None)
+    return files, plan
+
+
+def is_installed(version_id, index, installed_versions):
+    # Versions installed before the verify index existed, or by another tool, are
+    # only known to the installed-version index
+    if index.is_version_complete(version_id):
+        return True
+    entry = installed_versions.get(version_id) if installed_versions is not None else None
+    return entry is not None and entry['complete']
+
+
+def export_bundle(minecraft_directory, version_ids, bundle_path, index, installed_versions=None, callback=None):
+    # Every version must be complete; files are hashed while they are copied, so a
+    # damaged file on this machine is never exported
+    callback = callback or {}
+    minecraft_directory = abspath(minecraft_directory)
+    files = {}
+    versions = {}
+    for version_id in version_ids:
+        if not is_installed(version_id, index, installed_versions):
+            raise BundleError(f'{version_id} is not fully installed')
+        version_files, plan = bundle_files(minecraft_directory, version_id)
+        versions[version_id] = {'chain': plan.chain, 'size': 0}
+        for path, sha1 in version_files.items():
+            if not isfile(path):
+                raise BundleError(f'{path} is missing, repair the version before exporting')
+            files.setdefault(path, sha1)
+            versions[version_id]['size'] += getsize(path)
+
+    callback.get('setStatus', lambda value: None)(f'Exporting {len(files)} files')
+    callback.get('setMax', lambda value: None)(len(files))
+    entries = []
+    tmp_path = f'{bundle_path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as out:
+            out.write(HEADER.pack(MAGIC, 0, 0))
+            for count, (path, expected) in enumerate(sorted(files.items()), 1):
+                offset = out.tell()
+                sha1 = hashlib.sha1()
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                        sha1.update(chunk)
+                        out.write(chunk)
+                digest = sha1.hexdigest()
+                if expected is not None and digest != expected:
+                    raise BundleError(f'{path} does not match its checksum, repair the version before exporting')
+                entries.append({
+                    'path': relpath(path, minecraft_directory).replace(os.sep, '/'),
+                    'offset': offset,
+                    'size': out.tell() - offset,
+                    'sha1': digest,
+                    'mode': os.stat(path).st_mode & 0o777
+                })
+                callback.get('addBytes', lambda value: None)(entries[-1]['size'])
+                callback.get('setProgress', lambda value: None)(count)
+
+            manifest = json.dumps({
+                'format': FORMAT_VERSION,
+                'created': int(time.time()),
+                'versions': versions,
+                'entries': entries
+            }).encode()
+            manifest_offset = out.tell()
+            out.write(manifest)
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, manifest_offset, len(manifest)))
+        os.replace(tmp_path, bundle_path)
+    finally:
+        if isfile(tmp_path):
+            os.remove(tmp_path)
+    return {'versions': list(versions), 'files': len(entries), 'bytes': getsize(bundle_path)}
+
+
+def read_manifest(data):
+    if len(data) < HEADER.size:
+        raise BundleError('Not a DynamoLauncher bundle')
+    magic, manifest_offset, manifest_size = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or manifest_offset + manifest_size > len(data):
+        raise BundleError('Not a DynamoLauncher bundle or the file is truncated')
+    try:
+        manifest = json.loads(data[manifest_offset:manifest_offset + manifest_size])
+    except ValueError:
+        raise BundleError('The bundle manifest is damaged')
+    if manifest.get('format') != FORMAT_VERSION:
+        raise BundleError(f"Unsupported bundle format {manifest.get('format')}")
+    for entry in manifest['entries']:
+        if entry['offset'] < HEADER.size or entry['offset'] + entry['size'] > manifest_offset:
+            raise BundleError(f"{entry['path']}: entry lies outside the bundle data")
+    return manifest
+
+
+def bundle_info(bundle_path):
+    with open(bundle_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        manifest = read_manifest(data)
+    return {
+        'versions': manifest['versions'],
+        'files': len(manifest['entries']),
+        'bytes': sum(entry['size'] for entry in manifest['entries'])
+    }
+
+
+def entry_target(minecraft_directory, path):
+    target = normpath(join(minecraft_directory, path))
+    if not target.startswith(minecraft_directory + os.sep):
+        raise BundleError(f'{path}: entry points outside the launcher directory')
+    return target
+
+
+def import_bundle(bundle_path, minecraft_directory, index=None, store=None, installed_versions=None, workers=8,
+                  callback=None):
+    # Only entries missing or different on this machine are written, each one is
+    # hashed from the mapping before it replaces anything
+    callback = callback or {}
+    minecraft_directory = abspath(minecraft_directory)
+    start = time.perf_counter()
+    report = {'files': 0, 'extracted': 0, 'linked': 0, 'present': 0, 'extracted_bytes': 0}
+    lock = threading.Lock()
+
+    with open(bundle_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        manifest = read_manifest(data)
+        entries = manifest['entries']
+        targets = [entry_target(minecraft_directory, entry['path']) for entry in entries]
+        report['files'] = len(entries)
+        callback.get('setStatus', lambda value: None)(f'Importing {len(entries)} files')
+        callback.get('setMax', lambda value: None)(len(entries))
+
+        def done(kind, size=0):
+            with lock:
+                report[kind] += 1
+                report['extracted_bytes'] += size
+                callback.get('setProgress', lambda value: None)(
+                    report['extracted'] + report['linked'] + report['present'])
+            if size:
+                callback.get('addBytes', lambda value: None)(size)
+
+        def extract(entry, target):
+            sha1 = entry['sha1']
+            if index is not None and index.is_verified(target, sha1):
+                return done('present')
+            if isfile(target) and getsize(target) == entry['size'] and file_sha1(target) == sha1:
+                if index is not None:
+                    index.record(target, sha1)
+                return done('present')
+            if store is not None and store.has(sha1) and store.materialize(sha1, target, entry['size']):
+                if index is not None:
+                    index.record(target, sha1)
+                return done('linked')
+
+            with memoryview(data) as whole, whole[entry['offset']:entry['offset'] + entry['size']] as view:
+                if hashlib.sha1(view).hexdigest() != sha1:
+                    raise BundleError(f"{entry['path']}: checksum mismatch, the bundle is damaged")
+                os.makedirs(dirname(target), exist_ok=True)
+                tmp_path = f'{target}.{threading.get_ident()}.tmp'
+                with open(tmp_path, 'wb') as out:
+                    out.write(view)
+            # Bundles come from other machines, never let one set setuid or world-writable bits
+            os.chmod(tmp_path, entry['mode'] & 0o755)
+            os.replace(tmp_path, target)
+            if index is not None:
+                index.record(target, sha1)
+            if store is not None:
+                store.ingest(target, sha1)
+            done('extracted', entry['size'])
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bundle') as executor:
+                for future in [executor.submit(extract, entry, target) for entry, target in zip(entries, targets)]:
+                    future.result()
+        finally:
+            if index is not None:
+                index.save()
+
+    if store is not None:
+        store.add_refs(minecraft_directory, {entry['sha1']: entry['size'] for entry in entries})
+        store.save()
+    for version_id, version in manifest['versions'].items():
+        if index is not None:
+            index.mark_version_complete(version_id, version_json_paths(minecraft_directory, version['chain']))
+        if installed_versions is not None:
+            for chain_version_id in version['chain']:
+                installed_versions.update(chain_version_id, complete=True)
+            installed_versions.update(version_id, size=version['size'], installed_at=int(time.time()))
+    if index is not None:
+        index.save()
+
+    report['versions'] = list(manifest['versions'])
+    report['seconds'] = round(time.perf_counter() - start, 3)
+    return report
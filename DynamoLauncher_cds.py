@@ -0,0 +1,186 @@
+# Per-version dynamic class-data-sharing archives (JDK 13+). After a version has
+# launched successfully once, the next launch dumps the classes it loaded into
+# versions/<id>/<id>.jsa and every launch after that maps the archive instead
+# of loading and verifying those classes again. The archive is tied to the
+# classpath and the Java runtime it was built with.
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import time
+import uuid
+from os.path import join, isfile, dirname, realpath
+
+from DynamoLauncher_common import read_json, write_json_atomic
+
+NONE = 'none'
+CREATE = 'create'
+USE = 'use'
+
+MIN_JAVA_VERSION = 13
+MAX_TIMINGS = 20
+
+# A failure this early with an archive in use is blamed on the archive
+EARLY_FAILURE_SECONDS = 10
+
+java_versions = {}
+
+
+def parse_java_version(text):
+    # "17.0.8" -> 17, "1.8.0_51" -> 8
+    match = re.search(r'(\d+)(?:\.(\d+))?', text)
+    if match is None:
+        return None
+    major = int(match.group(1))
+    if major == 1 and match.group(2) is not None:
+        return int(match.group(2))
+    return major
+
+
+def resolve_java(java):
+    # A bare "java" from a version JSON without javaVersion is looked up on PATH
+    return realpath(shutil.which(java) or java)
+
+
+def java_identity(java):
+    # Path, size and mtime of the java binary plus its release file, cheap to compute on every launch
+    path = resolve_java(java)
+    stat = os.stat(path)
+    identity = f'{path}|{stat.st_size}|{stat.st_mtime_ns}'
+    release = join(dirname(dirname(path)), 'release')
+    if isfile(release):
+        stat = os.stat(release)
+        identity += f'|{stat.st_size}|{stat.st_mtime_ns}'
+    return identity
+
+
+def java_feature_version(java, identity):
+    if identity in java_versions:
+        return java_versions[identity]
+    version = None
+    release = join(dirname(dirname(resolve_java(java))), 'release')
+    try:
+        with open(release, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if line.startswith('JAVA_VERSION='):
+                    version = parse_java_version(line.split('=', 1)[1])
+                    break
+    except OSError:
+        pass
+    if version is None:
+        try:
+            result = subprocess.run([java, '-version'], capture_output=True, text=True, timeout=10)
+            match = re.search(r'version "([^"]+)"', result.stderr)
+            if match is not None:
+                version = parse_java_version(match.group(1))
+        except (OSError, subprocess.SubprocessError):
+            pass
+    java_versions[identity] = version
+    return version
+
+
+def command_classpath(command):
+    for i, argument in enumerate(command[:-1]):
+        if argument in ('-cp', '-classpath', '--class-path'):
+            return command[i + 1]
+    return None
+
+
+class ClassDataSharing:
+    def __init__(self, minecraft_directory, version_id):
+        self.version_id = version_id
+        self.directory = join(minecraft_directory, 'versions', version_id)
+        self.archive_path = join(self.directory, f'{version_id}.jsa')
+        self.meta_path = f'{self.archive_path}.json'
+        self.timings_path = join(self.directory, 'launch_timings.json')
+        self.mode = NONE
+        self.key = None
+        self.dump_path = None
+
+    def archive_key(self, command):
+        # None when this runtime can not create dynamic archives
+        classpath = command_classpath(command)
+        if classpath is None:
+            return None
+        try:
+            identity = java_identity(command[0])
+        except OSError:
+            return None
+        version = java_feature_version(command[0], identity)
+        if version is None or version < MIN_JAVA_VERSION:
+            return None
+
+        digest = hashlib.sha1(classpath.encode())
+        for entry in classpath.split(os.pathsep):
+            try:
+                stat = os.stat(entry)
+            except OSError:
+                continue
+            digest.update(f'|{stat.st_size}|{stat.st_mtime_ns}'.encode())
+        return {'classpath': digest.hexdigest(), 'runtime': identity, 'java': version}
+
+    def timings(self):
+        return read_json(self.timings_path, [])
+
+    def prepare(self, command):
+        # Returns the command with the archive flags for this launch and sets self.mode
+        self.key = self.archive_key(command)
+        if self.key is None:
+            self.mode = NONE
+            return command
+
+        if isfile(self.archive_path) and read_json(self.meta_path) == self.key:
+            self.mode = USE
+            flag = f'-XX:SharedArchiveFile={self.archive_path}'
+        elif any(timing['returncode'] == 0 for timing in self.timings()):
+            self.mode = CREATE
+            self.dump_path = f'{self.archive_path}.{uuid.uuid4().hex[:8]}.tmp'
+            flag = f'-XX:ArchiveClassesAtExit={self.dump_path}'
+        else:
+            # The first launch runs without an archive and gives the baseline timing
+            self.mode = NONE
+            return command
+        return [command[0], flag] + list(command[1:])
+
+    def finish(self, returncode, summary):
+        timings = self.timings()
+        timings.append({
+            'at': int(time.time()),
+            'cds': self.mode,
+            'window_seconds': summary.get('markers', {}).get('window') if summary else None,
+            'session_seconds': summary.get('session_seconds') if summary else None,
+            'returncode': returncode
+        })
+        write_json_atomic(self.timings_path, timings[-MAX_TIMINGS:])
+
+        if self.mode == CREATE:
+            try:
+                if returncode == 0 and isfile(self.dump_path):
+                    os.replace(self.dump_path, self.archive_path)
+                    write_json_atomic(self.meta_path, self.key)
+            except OSError:
+                # The old archive is still mapped by a running game (Windows)
+                pass
+            finally:
+                if isfile(self.dump_path):
+                    os.remove(self.dump_path)
+        elif self.mode == USE and returncode != 0 and summary is not None \
+                and summary.get('session_seconds', 0) < EARLY_FAILURE_SECONDS:
+            self.invalidate()
+
+    def invalidate(self):
+        for path in (self.meta_path, self.archive_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def timing_report(minecraft_directory, version_id):
+    # Median launch-to-window seconds by archive mode, from the recorded launches
+    report = {}
+    for timing in ClassDataSharing(minecraft_directory, version_id).timings():
+        if timing.get('window_seconds') is not None:
+            report.setdefault(timing['cds'], []).append(timing['window_seconds'])
+    return {mode: sorted(values)[len(values) // 2] for mode, values in report.items()}
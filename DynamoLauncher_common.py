@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+import threading
+from os.path import join, dirname, expanduser
+
+MANIFEST_URL = 'https://launchermeta.mojang.com/mc/game/version_manifest_v2.json'
+
+CACHE_FOLDER = 'launcher_cache'
+
+
+def get_launcher_directory():
+    # Same location rules as minecraft_launcher_lib.utils.get_minecraft_directory,
+    # without importing the library at startup
+    if sys.platform == 'win32':
+        minecraft = join(os.getenv('APPDATA', join(expanduser('~'), 'AppData', 'Roaming')), '.minecraft')
+    elif sys.platform == 'darwin':
+        minecraft = join(expanduser('~'), 'Library', 'Application Support', 'minecraft')
+    else:
+        minecraft = join(expanduser('~'), '.minecraft')
+    return minecraft.replace('minecraft', 'DynamoLauncher')
+
+
+def get_store_directory():
+    # Shared by every launcher root on this machine
+    return join(dirname(get_launcher_directory()), '.DynamoLauncherStore')
+
+
+def cache_directory(minecraft_directory):
+    return join(minecraft_directory, CACHE_FOLDER)
+
+
+def read_json(path, default=None):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def write_json_atomic(path, data):
+    # Write to a sibling temp file and rename so readers never see half a file
+    os.makedirs(dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
@@ -1,31 +1,404 @@
-import minecraft_launcher_lib
-import subprocess
+#   python DynamoLauncher_console.py                      interactive install and launch
+#   python DynamoLauncher_console.py install '1.20*' 1.19.4 --jobs 4 --dry-run
+#   python DynamoLauncher_console.py launch 1.20.4 --username Steve --jvm-profile low-pause
+#   python DynamoLauncher_console.py serve --port 8080
+#   python DynamoLauncher_console.py gc --quota 20G --dry-run
+#   python DynamoLauncher_console.py export 1.20.4 1.19.4 -o versions.dynbundle
+#   python DynamoLauncher_console.py import versions.dynbundle
+#   python DynamoLauncher_console.py --trace play.json launch 1.20.4 --username Steve
+import argparse
+import fnmatch
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from os.path import isfile, getsize
 
-minecraft_directory = minecraft_launcher_lib.utils.get_minecraft_directory().replace('minecraft', 'DynamoLauncher')
+from DynamoLauncher_bundle import BundleError, bundle_info, export_bundle, import_bundle
+from DynamoLauncher_common import get_launcher_directory, get_store_directory
+from DynamoLauncher_download import DownloadEngine, DownloadError
+from DynamoLauncher_gc import GarbageCollector, parse_size
+from DynamoLauncher_cds import ClassDataSharing, timing_report
+from DynamoLauncher_install import InstallPlanner, install_version, mirror_base
+from DynamoLauncher_jvm import PROFILES, DEFAULT_PROFILE, jvm_arguments
+from DynamoLauncher_launchplan import LaunchPlanCache
+from DynamoLauncher_manifest import ManifestCache, mirror_manifest_url
+from DynamoLauncher_mirror import MirrorServer
+from DynamoLauncher_progress import ProgressAggregator
+from DynamoLauncher_store import ContentStore
+from DynamoLauncher_supervisor import GameSupervisor, session_log_path, prune_sessions
+from DynamoLauncher_trace import enable as enable_tracing, report as trace_report
+from DynamoLauncher_verify import VerifyIndex
+from DynamoLauncher_versions import InstalledVersions
 
-version = input('Enter Minecraft version: ')
-username = input('Enter Username: ')
+minecraft_directory = get_launcher_directory()
 
-# Install Minecraft version with all dependencies needed
-minecraft_launcher_lib.install.install_minecraft_version(versionid=version, minecraft_directory=minecraft_directory)
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_NO_MATCH = 3
 
-# Define launch options
-options = {
-    'username': username,
-    'uuid': '',
-    'token': ''
-}
+output_lock = threading.Lock()
 
-# Launch Minecraft
-subprocess.call(minecraft_launcher_lib.command.get_minecraft_command(version=version, minecraft_directory=minecraft_directory, options=options))
 
-# MIT License
+def emit(event, **fields):
+    with output_lock:
+        print(json.dumps(dict(event=event, **fields)), flush=True)
+
+
+def create_manifest_cache(mirror):
+    if mirror is None:
+        return ManifestCache(minecraft_directory)
+    return ManifestCache(minecraft_directory, url=mirror_manifest_url(mirror_base(mirror)))
+
+
+def resolve_versions(patterns, manifest_cache, types):
+    known = [version['id'] for version in manifest_cache.get_version_list()
+             if not types or version['type'] in types]
+    resolved = []
+    for pattern in patterns:
+        if any(char in pattern for char in '*?['):
+            matches = fnmatch.filter(known, pattern)
+        else:
+            matches = [pattern]
+        for version_id in matches:
+            if version_id not in resolved:
+                resolved.append(version_id)
+    return resolved
+
+
+def is_on_disk(job, index):
+    # Dry-run check: stat only, nothing is hashed
+    if index.is_verified(job.path, job.sha1):
+        return True
+    return isfile(job.path) and (not job.size or getsize(job.path) == job.size)
+
+
+def dry_run(versions, engine, manifest_cache, mirror):
+    planner = InstallPlanner(minecraft_directory, engine, manifest_cache, mirror=mirror)
+    seen = set()
+    total_files = total_bytes = 0
+    status = EXIT_OK
+    for version_id in versions:
+        try:
+            plan = planner.plan(version_id)
+        except (ValueError, DownloadError, OSError) as e:
+            emit('error', version=version_id, error=str(e))
+            status = EXIT_FAILED
+            continue
+        missing = [job for job in plan.jobs if job.path not in seen and not is_on_disk(job, engine.index)]
+        seen.update(job.path for job in plan.jobs)
+        files = len(missing)
+        size = sum(job.size for job in missing)
+        total_files += files
+        total_bytes += size
+        emit('dry-run', version=version_id, files=files, bytes=size, planned_files=len(plan.jobs))
+    emit('dry-run-total', versions=len(versions), files=total_files, bytes=total_bytes)
+    return status
+
+
+def install_all(versions, engine, manifest_cache, args):
+    installed_versions = InstalledVersions(minecraft_directory)
+
+    def install(version_id):
+        def progress_for(tier):
+            return ProgressAggregator(
+                lambda value, maximum, label, stats: emit(
+                    'progress', version=version_id, tier=tier, progress=value, max=maximum, status=label,
+                    stats=stats),
+                rate=args.progress_rate
+            )
+
+        progress = progress_for('critical')
+        background_progress = progress_for('background')
+        progress.start()
+        background_progress.start()
+        try:
+            installed_versions.record_install_started(version_id)
+            plan = install_version(
+                version_id,
+                minecraft_directory,
+                engine,
+                manifest_cache=manifest_cache,
+                callback=progress.callback(),
+                repair=args.repair,
+                mirror=args.from_mirror,
+                background_callback=background_progress.callback()
+            )
+            installed_versions.record_install(version_id, plan)
+            progress.stop()
+            if plan is not None and plan.background is not None:
+                emit('launchable', version=version_id, seconds=round(plan.timings['finish'], 3))
+                plan.background.wait()
+        except Exception as e:
+            emit('failed', version=version_id, error=str(e))
+            return False
+        finally:
+            progress.stop()
+            background_progress.stop()
+        emit('installed', version=version_id, skipped=plan is None,
+             files=len(plan.jobs) if plan else 0,
+             timings={name: round(value, 3) for name, value in plan.timings.items()} if plan else {})
+        return True
+
+    # Installs share one download pool, so common libraries are fetched once
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        results = list(executor.map(install, versions))
+    return EXIT_OK if all(results) else EXIT_FAILED
+
+
+def command_install(args):
+    try:
+        manifest_cache = create_manifest_cache(args.from_mirror)
+    except ValueError as e:
+        emit('error', error=str(e))
+        return EXIT_USAGE
+
+    engine = DownloadEngine(
+        max_workers=args.workers,
+        per_host=args.per_host,
+        index=VerifyIndex(minecraft_directory),
+        store=None if args.no_store else ContentStore(get_store_directory())
+    )
+    try:
+        try:
+            versions = resolve_versions(args.versions, manifest_cache, args.type)
+        except (OSError, ValueError) as e:
+            emit('error', error=f'Could not load the version manifest: {e}')
+            return EXIT_FAILED
+        if not versions:
+            emit('error', error='No version matches ' + ' '.join(args.versions))
+            return EXIT_NO_MATCH
+
+        emit('plan', versions=versions)
+        if args.dry_run:
+            return dry_run(versions, engine, manifest_cache, args.from_mirror)
+        return install_all(versions, engine, manifest_cache, args)
+    finally:
+        engine.index.save()
+        engine.close()
+
+
+def command_serve(args):
+    mirror = MirrorServer(
+        args.root,
+        host=args.host,
+        port=args.port,
+        allowed_hosts=args.allow_host or ()
+    )
+    emit('serving', url=mirror.url, root=mirror.root)
+    try:
+        mirror.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mirror.httpd.server_close()
+        emit('stopped', **mirror.stats)
+    return EXIT_OK
+
+
+def launch(version, username, jvm_profile=DEFAULT_PROFILE, class_data_sharing=True):
+    # Install Minecraft version with all dependencies needed
+    engine = DownloadEngine(index=VerifyIndex(minecraft_directory))
+    try:
+        installed_versions = InstalledVersions(minecraft_directory)
+        installed_versions.record_install_started(version)
+        plan = install_version(version, minecraft_directory, engine, manifest_cache=ManifestCache(minecraft_directory))
+        installed_versions.record_install(version, plan)
+
+        # Define launch options
+        options = {
+            'username': username,
+            'uuid': '',
+            'token': '',
+            'jvmArguments': jvm_arguments(jvm_profile)
+        }
+
+        # Launch Minecraft, remaining assets keep downloading until the engine closes
+        launch_plans = LaunchPlanCache(minecraft_directory)
+        if plan is not None:
+            launch_plans.invalidate(version)
+        command = launch_plans.get_command(version, options)
+        cds = ClassDataSharing(minecraft_directory, version)
+        if class_data_sharing:
+            command = cds.prepare(command)
+        prune_sessions(minecraft_directory)
+        supervisor = GameSupervisor(command, session_log_path(minecraft_directory, version, 1)).start()
+        installed_versions.record_played(version)
+    finally:
+        engine.close()
+    returncode = supervisor.wait()
+    summary = supervisor.finish()
+    cds.finish(returncode, summary)
+    emit('exited', version=version, cds=cds.mode, window_seconds_by_cds=timing_report(minecraft_directory, version),
+         **summary)
+    return returncode
+
+
+def command_launch(args):
+    return launch(args.version, args.username, args.jvm_profile, not args.no_cds)
 
-# Copyright (c) 2023 Sstudiosdev
 
-# this version is for developers to 
-# maker the app work they need the 
-# libraries off
+def command_gc(args):
+    try:
+        quota = parse_size(args.quota)
+    except ValueError:
+        emit('error', error=f'Invalid quota: {args.quota}')
+        return EXIT_USAGE
+
+    def on_event(kind, **fields):
+        if kind == 'evict' or args.verbose:
+            emit(kind, **fields)
+
+    collector = GarbageCollector(
+        minecraft_directory,
+        InstalledVersions(minecraft_directory),
+        verify_index=VerifyIndex(minecraft_directory),
+        store=None if args.no_store else ContentStore(get_store_directory()),
+        workers=args.workers
+    )
+    report = collector.collect(quota=quota, dry_run=args.dry_run, protected=args.keep or (), on_event=on_event)
+    emit('gc', **report)
+    return EXIT_FAILED if report['unresolved'] else EXIT_OK
+
+
+def bundle_progress(args):
+    return ProgressAggregator(
+        lambda value, maximum, label, stats: emit('progress', progress=value, max=maximum, status=label, stats=stats),
+        rate=args.progress_rate
+    )
+
+
+def command_export(args):
+    progress = bundle_progress(args)
+    progress.start()
+    try:
+        report = export_bundle(minecraft_directory, args.versions, args.output, VerifyIndex(minecraft_directory),
+                               installed_versions=InstalledVersions(minecraft_directory),
+                               callback=progress.callback())
+    except (BundleError, ValueError, OSError) as e:
+        emit('error', error=str(e))
+        return EXIT_FAILED
+    finally:
+        progress.stop()
+    emit('exported', path=args.output, **report)
+    return EXIT_OK
+
+
+def command_import(args):
+    try:
+        emit('bundle', path=args.bundle, **bundle_info(args.bundle))
+    except (BundleError, ValueError, OSError) as e:
+        emit('error', error=str(e))
+        return EXIT_FAILED
+
+    progress = bundle_progress(args)
+    progress.start()
+    try:
+        report = import_bundle(
+            args.bundle,
+            minecraft_directory,
+            index=VerifyIndex(minecraft_directory),
+            store=None if args.no_store else ContentStore(get_store_directory()),
+            installed_versions=InstalledVersions(minecraft_directory),
+            workers=args.workers,
+            callback=progress.callback()
+        )
+    except (BundleError, ValueError, OSError) as e:
+        emit('error', error=str(e))
+        return EXIT_FAILED
+    finally:
+        progress.stop()
+    emit('imported', **report)
+    return EXIT_OK
+
+
+def interactive():
+    version = input('Enter Minecraft version: ')
+    username = input('Enter Username: ')
+    return launch(version, username)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        return interactive()
+
+    parser = argparse.ArgumentParser(description='DynamoLauncher console')
+    parser.add_argument('--trace', metavar='PATH',
+                        help='write a Chrome trace (chrome://tracing, ui.perfetto.dev) and print a span summary')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    install = subparsers.add_parser('install', help='install versions without prompting, progress as JSON lines')
+    install.add_argument('versions', nargs='+', help='version ids or globs such as 1.20*')
+    install.add_argument('--type', action='append', help='only match globs against this version type (repeatable)')
+    install.add_argument('--jobs', type=int, default=2, help='versions installed at the same time')
+    install.add_argument('--workers', type=int, default=16, help='shared download pool size')
+    install.add_argument('--per-host', type=int, default=8)
+    install.add_argument('--dry-run', action='store_true',
+                         help='print files and bytes to fetch, only version metadata is downloaded')
+    install.add_argument('--from-mirror', metavar='URL_OR_DIR',
+                         help='fetch everything from an HTTP mirror or a directory laid out like the launcher root')
+    install.add_argument('--no-store', action='store_true', help='do not use the shared content store')
+    install.add_argument('--repair', action='store_true', help='re-check files of versions marked complete')
+    install.add_argument('--progress-rate', type=float, default=2, help='progress lines per second per version')
+    install.set_defaults(func=command_install)
+
+    launch_parser = subparsers.add_parser('launch', help='install if needed and play one version')
+    launch_parser.add_argument('version')
+    launch_parser.add_argument('--username', required=True)
+    launch_parser.add_argument('--jvm-profile', choices=list(PROFILES), default=DEFAULT_PROFILE,
+                               help='heap size and garbage collector settings')
+    launch_parser.add_argument('--no-cds', action='store_true',
+                               help='do not build or use a class-data-sharing archive for this launch')
+    launch_parser.set_defaults(func=command_launch)
+
+    serve = subparsers.add_parser('serve', help='share this launcher root as a read-through LAN mirror')
+    serve.add_argument('--host', default='0.0.0.0')
+    serve.add_argument('--port', type=int, default=8080)
+    serve.add_argument('--root', default=minecraft_directory, help='directory to serve and cache into')
+    serve.add_argument('--allow-host', action='append', metavar='HOST[:PORT]',
+                       help='extra upstream host clients may ask the mirror to fetch from (repeatable)')
+    serve.set_defaults(func=command_serve)
+
+    gc = subparsers.add_parser('gc', help='remove orphaned files and evict least recently played versions')
+    gc.add_argument('--quota', default='0', help='size the launcher root may use, such as 20G; 0 evicts nothing')
+    gc.add_argument('--dry-run', action='store_true', help='report what would be removed, delete nothing')
+    gc.add_argument('--keep', action='append', metavar='VERSION', help='never evict this version (repeatable)')
+    gc.add_argument('--workers', type=int, default=8, help='directories scanned in parallel')
+    gc.add_argument('--no-store', action='store_true', help='leave the shared content store alone')
+    gc.add_argument('--verbose', action='store_true', help='print every orphaned file')
+    gc.set_defaults(func=command_gc)
+
+    export = subparsers.add_parser('export', help='write installed versions to one bundle file for offline machines')
+    export.add_argument('versions', nargs='+', help='installed version ids')
+    export.add_argument('-o', '--output', required=True, help='bundle file to write')
+    export.add_argument('--progress-rate', type=float, default=2, help='progress lines per second')
+    export.set_defaults(func=command_export)
+
+    import_parser = subparsers.add_parser('import', help='install the versions in a bundle without network access')
+    import_parser.add_argument('bundle')
+    import_parser.add_argument('--workers', type=int, default=8, help='files extracted in parallel')
+    import_parser.add_argument('--no-store', action='store_true', help='do not use the shared content store')
+    import_parser.add_argument('--progress-rate', type=float, default=2, help='progress lines per second')
+    import_parser.set_defaults(func=command_import)
+
+    args = parser.parse_args(argv)
+    if args.trace is None:
+        return args.func(args)
+
+    tracer = enable_tracing()
+    try:
+        return args.func(args)
+    finally:
+        tracer.save(args.trace)
+        print(trace_report(), file=sys.stderr)
+        emit('trace', path=args.trace)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# MIT License
 
-# python
-# minecraft-lancher-lib
+# Copyright (c) 2023 Sstudios
@@ -0,0 +1,356 @@
+import hashlib
+import http.client
+import os
+import ssl
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from os.path import dirname, getsize, isfile
+from urllib.parse import urljoin, urlsplit
+from urllib.request import url2pathname
+
+from DynamoLauncher_trace import span, count
+
+CHUNK_SIZE = 64 * 1024
+MAX_REDIRECTS = 5
+
+
+class DownloadError(Exception):
+    pass
+
+
+class ChecksumError(DownloadError):
+    pass
+
+
+class DownloadJob:
+    def __init__(self, url, path, sha1=None, size=0):
+        self.url = url
+        self.path = path
+        self.sha1 = sha1
+        self.size = size
+
+    def __repr__(self):
+        return f'DownloadJob({self.url!r}, {self.path!r})'
+
+
+class DownloadBatch:
+    # Completion tracking for one submit() call; pending jobs are skipped after cancel()
+    def __init__(self, total, callback):
+        self.total = total
+        self.callback = callback
+        self.done = 0
+        self.errors = []
+        self.cancelled = False
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.done_callbacks = []
+        if total == 0:
+            self.finished.set()
+
+    def job_done(self, error=None):
+        with self.lock:
+            self.done += 1
+            if error is not None:
+                self.errors.append(error)
+            self.callback.get('setProgress', lambda value: None)(self.done)
+            if self.done < self.total:
+                return
+            self.finished.set()
+            done_callbacks, self.done_callbacks = self.done_callbacks, []
+        for done_callback in done_callbacks:
+            done_callback(self)
+
+    def add_done_callback(self, done_callback):
+        with self.lock:
+            if not self.finished.is_set():
+                self.done_callbacks.append(done_callback)
+                return
+        done_callback(self)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def wait(self, timeout=None):
+        if not self.finished.wait(timeout):
+            return False
+        if self.errors:
+            raise self.errors[0]
+        return True
+
+
+def file_sha1(path, sha1=None):
+    sha1 = sha1 or hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class DownloadEngine:
+    def __init__(self, max_workers=16, per_host=8, timeout=30, retries=3, index=None, store=None,
+                 background_workers=None):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.index = index
+        self.store = store
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='download')
+        # Low-priority work gets its own smaller pool so it never queues ahead of launch-critical files
+        self.background_executor = ThreadPoolExecutor(
+            max_workers=background_workers or max(2, max_workers // 4),
+            thread_name_prefix='download-background'
+        )
+        self.host_slots = defaultdict(lambda: threading.BoundedSemaphore(self.per_host))
+        self.lock = threading.Lock()
+        self.ssl_context = ssl.create_default_context()
+        # Each worker thread keeps one keep-alive connection per host
+        self.local = threading.local()
+        self.all_connections = []
+        # Concurrent installs asking for the same file share one transfer
+        self.inflight = {}
+
+    def connection(self, scheme, netloc):
+        connections = getattr(self.local, 'connections', None)
+        if connections is None:
+            connections = self.local.connections = {}
+
+        key = (scheme, netloc)
+        conn = connections.get(key)
+        if conn is None:
+            if scheme == 'https':
+                conn = http.client.HTTPSConnection(netloc, timeout=self.timeout, context=self.ssl_context)
+            else:
+                conn = http.client.HTTPConnection(netloc, timeout=self.timeout)
+            connections[key] = conn
+            with self.lock:
+                self.all_connections.append(conn)
+        return conn
+
+    def drop_connection(self, scheme, netloc):
+        conn = getattr(self.local, 'connections', {}).pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def request(self, url, headers=None):
+        # Returns an open response with status 200/206, following redirects
+        for _ in range(MAX_REDIRECTS):
+            parts = urlsplit(url)
+            target = parts.path or '/'
+            if parts.query:
+                target += '?' + parts.query
+
+            conn = self.connection(parts.scheme, parts.netloc)
+            try:
+                conn.request('GET', target, headers=headers or {})
+                response = conn.getresponse()
+            except (http.client.HTTPException, OSError):
+                # The server may have closed an idle keep-alive connection; retry once on a fresh one
+                self.drop_connection(parts.scheme, parts.netloc)
+                conn = self.connection(parts.scheme, parts.netloc)
+                conn.request('GET', target, headers=headers or {})
+                response = conn.getresponse()
+
+            if response.status in (301, 302, 303, 307, 308):
+                response.read()
+                url = urljoin(url, response.getheader('Location'))
+                continue
+            if response.status not in (200, 206, 416):
+                response.read()
+                raise DownloadError(f'{url}: HTTP {response.status}')
+            return response, parts
+        raise DownloadError(f'{url}: too many redirects')
+
+    def is_present(self, job):
+        if self.index is not None and self.index.is_verified(job.path, job.sha1):
+            return True
+        if not isfile(job.path):
+            return False
+        if job.sha1 is None:
+            return True
+        sha1 = file_sha1(job.path)
+        if sha1 != job.sha1:
+            return False
+        if self.index is not None:
+            self.index.record(job.path, sha1)
+        return True
+
+    def from_store(self, job):
+        if self.store is None or job.sha1 is None or not self.store.has(job.sha1):
+            return False
+        try:
+            if not self.store.materialize(job.sha1, job.path, job.size):
+                return False
+        except OSError:
+            # Store on a full or read-only disk, the file is downloaded instead
+            return False
+        if self.index is not None:
+            self.index.record(job.path, job.sha1)
+        return True
+
+    def fetch(self, job):
+        # Returns the number of bytes transferred, 0 when the file was already
+        # present or another install fetched it
+        with self.lock:
+            done = self.inflight.get(job.path)
+            if done is None:
+                done = self.inflight[job.path] = threading.Event()
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            done.wait()
+            if self.is_present(job):
+                return 0
+            raise DownloadError(f'{job.url}: shared download failed')
+
+        try:
+            return self.fetch_file(job)
+        finally:
+            with self.lock:
+                del self.inflight[job.path]
+            done.set()
+
+    def fetch_file(self, job):
+        with span('verify', 'download'):
+            present = self.is_present(job)
+        if present:
+            count('files present')
+            if self.store is not None and job.sha1 is not None:
+                self.store.ingest(job.path, job.sha1)
+            return 0
+        if self.from_store(job):
+            count('files linked')
+            return 0
+
+        os.makedirs(dirname(job.path), exist_ok=True)
+        host = urlsplit(job.url).netloc
+        last_error = None
+
+        for _ in range(self.retries):
+            with self.host_slots[host], span('download', 'download', url=job.url) as download_span:
+                try:
+                    received = self.transfer(job)
+                    download_span.set(bytes=received)
+                    count('files downloaded')
+                    count('bytes downloaded', received)
+                    return received
+                except ChecksumError as e:
+                    last_error = e
+                except (DownloadError, http.client.HTTPException, OSError) as e:
+                    last_error = e
+                    self.drop_connection(*urlsplit(job.url)[:2])
+        raise DownloadError(f'{job.url}: {last_error}')
+
+    def copy_local(self, job):
+        # file:// URLs come from directory mirrors, copied with the same verification
+        source = url2pathname(urlsplit(job.url).path)
+        part_path = job.path + '.part'
+        sha1 = hashlib.sha1()
+        received = 0
+        with open(source, 'rb') as src, open(part_path, 'wb') as dst:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                dst.write(chunk)
+                sha1.update(chunk)
+                received += len(chunk)
+        return part_path, sha1.hexdigest(), received
+
+    def transfer(self, job):
+        if job.url.startswith('file:'):
+            part_path, digest, received = self.copy_local(job)
+            return self.finish(job, part_path, digest, received)
+
+        # Partial files left by an interrupted run are resumed with a Range request,
+        # the hash is computed while the bytes stream in
+        part_path = job.path + '.part'
+        offset = getsize(part_path) if isfile(part_path) else 0
+        if offset and offset == job.size:
+            # Interrupted after the last byte, before the rename
+            return self.finish(job, part_path, file_sha1(part_path), 0)
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+
+        response, _ = self.request(job.url, headers)
+        if response.status == 416:
+            response.read()
+            if response.getheader('Content-Range', '') == f'bytes */{offset}':
+                # The partial file already holds every byte the server has
+                return self.finish(job, part_path, file_sha1(part_path), 0)
+            # The partial file is not a prefix of anything the server has
+            os.remove(part_path)
+            raise DownloadError(f'{job.url}: stale partial download')
+
+        sha1 = hashlib.sha1()
+        if response.status == 206:
+            if not response.getheader('Content-Range', '').startswith(f'bytes {offset}-'):
+                # Not the range that was asked for, appending it would corrupt the file
+                os.remove(part_path)
+                raise DownloadError(f'{job.url}: unexpected Content-Range')
+            file_sha1(part_path, sha1)
+            mode = 'ab'
+        else:
+            mode = 'wb'
+
+        received = 0
+        with open(part_path, mode) as f:
+            while True:
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+                sha1.update(chunk)
+                received += len(chunk)
+
+        return self.finish(job, part_path, sha1.hexdigest(), received)
+
+    def finish(self, job, part_path, digest, received):
+        if job.sha1 is not None and digest != job.sha1:
+            os.remove(part_path)
+            raise ChecksumError(f'{job.url}: sha1 mismatch')
+        os.replace(part_path, job.path)
+        if self.index is not None:
+            self.index.record(job.path, digest)
+        if self.store is not None and job.sha1 is not None:
+            self.store.ingest(job.path, digest)
+        return received
+
+    def run_job(self, batch, job):
+        if batch.cancelled:
+            batch.job_done()
+            return
+        try:
+            received = self.fetch(job)
+            batch.callback.get('addBytes', lambda value: None)(received)
+        except Exception as e:
+            batch.job_done(e)
+            return
+        batch.job_done()
+
+    def submit(self, jobs, callback=None, status='Downloading files', background=False):
+        # Drives the same setStatus/setProgress/setMax callbacks as minecraft_launcher_lib
+        callback = callback or {}
+        jobs = list(jobs)
+        callback.get('setStatus', lambda value: None)(status)
+        callback.get('setMax', lambda value: None)(len(jobs))
+        callback.get('setProgress', lambda value: None)(0)
+
+        batch = DownloadBatch(len(jobs), callback)
+        if self.store is not None:
+            batch.add_done_callback(lambda batch: self.store.save())
+        executor = self.background_executor if background else self.executor
+        for job in jobs:
+            executor.submit(self.run_job, batch, job)
+        return batch
+
+    def download(self, jobs, callback=None, status='Downloading files', background=False):
+        self.submit(jobs, callback, status, background).wait()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.background_executor.shutdown(wait=True)
+        with self.lock:
+            for conn in self.all_connections:
+                conn.close()
+            self.all_connections = []
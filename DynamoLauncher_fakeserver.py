@@ -0,0 +1,240 @@
+# Local HTTP stand-in for the Mojang endpoints, used to exercise the launcher
+# offline. Run it directly to serve a synthetic manifest:
+#   python DynamoLauncher_fakeserver.py [port]
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MANIFEST_PATH = '/mc/game/version_manifest_v2.json'
+# Where a launcher-root mirror serves the manifest, see mirror_manifest_url()
+MIRROR_MANIFEST_PATH = '/launcher_cache/version_manifest_v2.json'
+CHUNK_SIZE = 64 * 1024
+
+
+def make_manifest(count=700):
+    versions = []
+    for i in range(count):
+        version_id = f'1.{count - i}.0'
+        versions.append({
+            'id': version_id,
+            'type': 'release' if i % 5 else 'snapshot',
+            'url': f'/v1/packages/{version_id}.json',
+            'time': '2023-01-01T00:00:00+00:00',
+            'releaseTime': '2023-01-01T00:00:00+00:00',
+            'sha1': hashlib.sha1(version_id.encode()).hexdigest(),
+            'complianceLevel': 1
+        })
+    return {'latest': {'release': versions[0]['id'], 'snapshot': versions[0]['id']}, 'versions': versions}
+
+
+def add_synthetic_assets(server, count=1000, size=4096, prefix='/objects'):
+    # Serves count random objects under prefix and returns the matching asset index
+    objects = {}
+    for i in range(count):
+        data = os.urandom(size)
+        object_hash = hashlib.sha1(data).hexdigest()
+        server.add_file(f'{prefix}/{object_hash[:2]}/{object_hash}', data)
+        # Roughly the real mix: most objects are sounds, the rest textures and the like
+        name = f'minecraft/sounds/synthetic/{i}.ogg' if i % 3 else f'minecraft/textures/synthetic/{i}.png'
+        objects[name] = {'hash': object_hash, 'size': size}
+    return {'objects': objects}
+
+
+def add_synthetic_version(server, version_id, libraries=40, objects=1000, size=4096, mirror_layout=False):
+    # Serves a complete fake version (client jar, libraries, asset index and objects)
+    # and returns its manifest entry; URLs point back at the server. With
+    # mirror_layout every file is also served where a launcher-root mirror has it,
+    # so installs can use the server as mirror= instead of the Mojang hosts.
+    def artifact(path, data, prefix=''):
+        server.add_file(f'/{prefix}{path}', data)
+        return {'path': path, 'url': f'{server.url}/{prefix}{path}', 'sha1': hashlib.sha1(data).hexdigest(),
+                'size': len(data)}
+
+    index = add_synthetic_assets(server, objects, size, prefix='/objects')
+    for item in index['objects'].values():
+        object_hash = item['hash']
+        item['url'] = f'{server.url}/objects/{object_hash[:2]}/{object_hash}'
+    index_data = json.dumps({'objects': {name: {'hash': item['hash'], 'size': item['size']}
+                                         for name, item in index['objects'].items()}}).encode()
+    asset_index = artifact(f'indexes/{version_id}.json', index_data)
+    asset_index['id'] = version_id
+
+    version = {
+        'id': version_id,
+        'type': 'release',
+        'mainClass': 'net.minecraft.client.main.Main',
+        'assets': version_id,
+        'assetIndex': asset_index,
+        'downloads': {'client': artifact(f'client/{version_id}.jar', os.urandom(size * 4))},
+        'libraries': [
+            {'name': f'com.example:lib{i}:1.0',
+             # Same name, same bytes: versions share their libraries like real ones do
+             'downloads': {'artifact': artifact(f'com/example/lib{i}/1.0/lib{i}-1.0.jar',
+                                                random.Random(i).randbytes(size), 'libraries/')}}
+            for i in range(libraries)
+        ],
+        'arguments': {'game': ['--username', '${auth_player_name}', '--uuid', '${auth_uuid}'], 'jvm': ['-cp', '${classpath}']}
+    }
+    version_data = json.dumps(version).encode()
+    path = f'/v1/packages/{version_id}.json'
+    server.add_file(path, version_data, 'application/json')
+    if mirror_layout:
+        server.alias(path, f'/versions/{version_id}/{version_id}.json')
+        server.alias(f'/client/{version_id}.jar', f'/versions/{version_id}/{version_id}.jar')
+        server.alias(f'/indexes/{version_id}.json', f'/assets/indexes/{version_id}.json')
+        for item in index['objects'].values():
+            object_path = f"/objects/{item['hash'][:2]}/{item['hash']}"
+            server.alias(object_path, '/assets' + object_path)
+    return {
+        'id': version_id,
+        'type': 'release',
+        'url': f'{server.url}{path}',
+        'time': '2023-01-01T00:00:00+00:00',
+        'releaseTime': '2023-01-01T00:00:00+00:00',
+        'sha1': hashlib.sha1(version_data).hexdigest(),
+        'complianceLevel': 1
+    }
+
+
+class FakeServer:
+    # latency: seconds added to every response. bandwidth: bytes per second shared
+    # by all responses, like one network link; None is unlimited.
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, bandwidth=None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.link_free_at = 0.0
+        self.files = {}
+        self.requests = []
+        self.lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def add_file(self, path, data, content_type='application/octet-stream'):
+        with self.lock:
+            self.files[path] = {
+                'data': data,
+                'type': content_type,
+                'etag': '"' + hashlib.sha1(data).hexdigest() + '"',
+                'last_modified': formatdate(usegmt=True)
+            }
+
+    def alias(self, path, alias_path):
+        with self.lock:
+            self.files[alias_path] = self.files[path]
+
+    def set_manifest(self, manifest):
+        self.add_file(MANIFEST_PATH, json.dumps(manifest).encode(), 'application/json')
+        self.alias(MANIFEST_PATH, MIRROR_MANIFEST_PATH)
+
+    def write_body(self, handler, data):
+        if not self.bandwidth:
+            handler.wfile.write(data)
+            return
+        for offset in range(0, len(data), CHUNK_SIZE):
+            chunk = data[offset:offset + CHUNK_SIZE]
+            with self.lock:
+                start = max(time.monotonic(), self.link_free_at)
+                self.link_free_at = start + len(chunk) / self.bandwidth
+                delay = self.link_free_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            handler.wfile.write(chunk)
+
+    def count(self, path, status=None):
+        with self.lock:
+            return sum(1 for p, s in self.requests if p == path and (status is None or s == status))
+
+    def handle(self, handler):
+        path = handler.path.split('?', 1)[0]
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            entry = self.files.get(path)
+
+        if entry is None:
+            status = 404
+            handler.send_response(404)
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+        elif (handler.headers.get('If-None-Match') == entry['etag'] or
+              handler.headers.get('If-Modified-Since') == entry['last_modified']):
+            status = 304
+            handler.send_response(304)
+            handler.send_header('ETag', entry['etag'])
+            handler.end_headers()
+        else:
+            data = entry['data']
+            offset = 0
+            range_header = handler.headers.get('Range', '')
+            if range_header.startswith('bytes=') and range_header.endswith('-'):
+                offset = int(range_header[6:-1])
+
+            if offset >= len(data) and offset:
+                status = 416
+                handler.send_response(416)
+                handler.send_header('Content-Range', f'bytes */{len(data)}')
+                handler.send_header('Content-Length', '0')
+                handler.end_headers()
+            else:
+                status = 206 if offset else 200
+                handler.send_response(status)
+                handler.send_header('Content-Type', entry['type'])
+                handler.send_header('Content-Length', str(len(data) - offset))
+                if offset:
+                    handler.send_header('Content-Range', f'bytes {offset}-{len(data) - 1}/{len(data)}')
+                handler.send_header('Accept-Ranges', 'bytes')
+                handler.send_header('ETag', entry['etag'])
+                handler.send_header('Last-Modified', entry['last_modified'])
+                handler.end_headers()
+                self.write_body(handler, data[offset:])
+
+        with self.lock:
+            self.requests.append((path, status))
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+    fake = FakeServer(port=port)
+    fake.set_manifest(make_manifest())
+    print(f'Serving fake manifest at {fake.url}{MANIFEST_PATH}')
+    fake.httpd.serve_forever()
@@ -0,0 +1,260 @@
+# Disk garbage collection for a launcher root. Everything reachable from the
+# installed version JSONs and their asset indexes is kept, other files under
+# libraries/ and assets/ are orphans. When a quota is set, whole versions are
+# evicted least recently played first until the root fits.
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from os.path import join, isdir, isfile, dirname, abspath
+
+from DynamoLauncher_common import read_json
+from DynamoLauncher_install import InstallPlanner
+
+# Directories scanned for orphans, relative to minecraft_directory. Legacy
+# asset copies (assets/virtual, resources) are rebuilt by installs and left alone.
+SCANNED_DIRECTORIES = ('libraries', join('assets', 'objects'), join('assets', 'indexes'),
+                       join('assets', 'log_configs'))
+
+
+def scan_files(roots, workers=8):
+    # Yields (path, size) for every file below roots. Directories are listed in
+    # parallel and files are handed out as each listing finishes, so memory is
+    # bounded by the directories in flight, not by the size of the tree.
+    def list_directory(path):
+        files, directories = [], []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            directories.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            files.append((entry.path, entry.stat(follow_symlinks=False).st_size))
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        return files, directories
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gc-scan') as executor:
+        pending = {executor.submit(list_directory, root) for root in roots if isdir(root)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, directories = future.result()
+                pending.update(executor.submit(list_directory, directory) for directory in directories)
+                yield from files
+
+
+def remove_empty_parents(path, stop):
+    directory = dirname(path)
+    while directory != stop and directory.startswith(stop + os.sep):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = dirname(directory)
+
+
+class GarbageCollector:
+    def __init__(self, minecraft_directory, installed_versions, verify_index=None, store=None, workers=8):
+        self.minecraft_directory = abspath(minecraft_directory)
+        self.installed_versions = installed_versions
+        self.verify_index = verify_index
+        self.store = store
+        self.workers = workers
+        self.planner = InstallPlanner(self.minecraft_directory, None)
+
+    def version_files(self, version_id):
+        # {path: expected size} of everything the version uses, from files already on disk only.
+        # Raises when part of the chain or its asset index is missing.
+        plan = self.planner.plan(version_id)
+        files = {abspath(job.path): job.size for job in plan.jobs}
+        for chain_version_id in plan.chain:
+            directory = join(self.minecraft_directory, 'versions', chain_version_id)
+            files[abspath(join(directory, f'{chain_version_id}.json'))] = 0
+            asset_index = read_json(join(directory, f'{chain_version_id}.json'), {}).get('assetIndex')
+            if asset_index is not None:
+                files[abspath(join(self.minecraft_directory, 'assets', 'indexes', f"{asset_index['id']}.json"))] = \
+                    asset_index.get('size', 0)
+        return files, plan
+
+    def root_versions(self):
+        # The index plus every versions/<id>/<id>.json on disk, so a profile installed
+        # while the launcher was closed (Forge, Fabric...) keeps its files
+        entries = self.installed_versions.entries()
+        on_disk = [version_id for version_id in self.installed_versions.list_directory()
+                   if version_id not in entries and isfile(self.version_json_path(version_id))]
+        return entries, list(entries) + on_disk
+
+    def version_json_path(self, version_id):
+        return join(self.minecraft_directory, 'versions', version_id, f'{version_id}.json')
+
+    def reachability(self):
+        # Returns ({version: {path: size}}, {version: sha1 refs}, {version: chain}, unresolved versions,
+        # stale versions). Stale entries are failed installs or prefetches that never wrote
+        # their version JSON; they use nothing, so they do not hold back orphan removal.
+        versions, refs, chains, unresolved, stale = {}, {}, {}, [], []
+        entries, version_ids = self.root_versions()
+        for version_id in version_ids:
+            entry = entries.get(version_id)
+            try:
+                files, plan = self.version_files(version_id)
+            except Exception:
+                if entry is not None and not entry['complete'] and not isfile(self.version_json_path(version_id)):
+                    stale.append(version_id)
+                else:
+                    unresolved.append(version_id)
+                continue
+            versions[version_id] = files
+            refs[version_id] = {job.sha1: job.size for job in plan.jobs if job.sha1}
+            chains[version_id] = plan.chain
+        return versions, refs, chains, unresolved, stale
+
+    def eviction_order(self, protected):
+        entries = self.installed_versions.entries()
+        candidates = [version_id for version_id in entries if version_id not in protected]
+        return sorted(candidates, key=lambda version_id: (entries[version_id].get('last_played') or 0,
+                                                          entries[version_id].get('installed_at') or 0))
+
+    def version_directory_size(self, version_id):
+        return sum(size for _, size in scan_files([join(self.minecraft_directory, 'versions', version_id)],
+                                                  self.workers))
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            return False
+        if self.verify_index is not None:
+            self.verify_index.forget(path)
+        remove_empty_parents(path, self.minecraft_directory)
+        return True
+
+    def collect(self, quota=0, dry_run=True, protected=(), on_event=None, busy=None):
+        # quota in bytes, 0 keeps every version. on_event(kind, **fields) sees each
+        # orphan and eviction as it is found. busy() returns the versions installing
+        # or running right now; it is asked again before every eviction.
+        on_event = on_event or (lambda kind, **fields: None)
+        busy = busy or (lambda: ())
+        protected = set(protected)
+        # Files written after this belong to an install that started during the scan
+        started = time.time()
+        versions, refs, chains, unresolved, stale = self.reachability()
+        if not dry_run:
+            # Installs still running may not have written their JSON yet
+            in_use = busy()
+            for version_id in stale:
+                if version_id not in in_use:
+                    self.installed_versions.remove(version_id)
+        reachable = set()
+        for files in versions.values():
+            reachable.update(files)
+
+        report = {
+            'dry_run': dry_run, 'quota': quota, 'scanned_files': 0, 'scanned_bytes': 0,
+            'orphan_files': 0, 'orphan_bytes': 0, 'evicted': [], 'evicted_bytes': 0,
+            'unresolved': unresolved, 'store_blobs_removed': 0
+        }
+
+        # An unreadable version could still use anything, so nothing is an orphan then
+        roots = [join(self.minecraft_directory, directory) for directory in SCANNED_DIRECTORIES]
+        for path, size in scan_files(roots + [join(self.minecraft_directory, 'versions')], self.workers):
+            report['scanned_files'] += 1
+            report['scanned_bytes'] += size
+            if unresolved or path in reachable or not path.startswith(tuple(root + os.sep for root in roots)):
+                continue
+            if path.endswith('.part') or path.endswith('.tmp'):
+                # Possibly an install in progress
+                continue
+            try:
+                if os.stat(path).st_mtime >= started:
+                    continue
+            except OSError:
+                continue
+            report['orphan_files'] += 1
+            report['orphan_bytes'] += size
+            on_event('orphan', path=path, bytes=size)
+            if not dry_run:
+                self.remove(path)
+
+        usage = report['scanned_bytes'] - report['orphan_bytes']
+        if quota:
+            counts = {}
+            for files in versions.values():
+                for path in files:
+                    counts[path] = counts.get(path, 0) + 1
+            for version_id in self.eviction_order(protected | set(stale)):
+                if usage <= quota:
+                    break
+                if version_id in busy():
+                    continue
+                if any(version_id in chain[1:] for other, chain in chains.items() if other in versions):
+                    # Still inherited by a version that stays
+                    continue
+                if version_id not in versions:
+                    # Unresolved versions only free their own directory
+                    files = {}
+                else:
+                    files = versions.pop(version_id)
+                freed = 0
+                exclusive = []
+                for path in files:
+                    counts[path] -= 1
+                    # With an unreadable version around only the version's own directory is freed
+                    if counts[path] == 0 and not unresolved and \
+                            not path.startswith(join(self.minecraft_directory, 'versions') + os.sep):
+                        exclusive.append(path)
+                        try:
+                            freed += os.stat(path).st_size
+                        except OSError:
+                            pass
+                freed += self.version_directory_size(version_id)
+                entry = self.installed_versions.get(version_id) or {}
+                report['evicted'].append({'version': version_id, 'bytes': freed,
+                                          'last_played': entry.get('last_played')})
+                report['evicted_bytes'] += freed
+                usage -= freed
+                on_event('evict', version=version_id, bytes=freed, last_played=entry.get('last_played'))
+                if dry_run:
+                    continue
+                for path in exclusive:
+                    self.remove(path)
+                shutil.rmtree(join(self.minecraft_directory, 'versions', version_id), ignore_errors=True)
+                self.installed_versions.remove(version_id)
+                refs.pop(version_id, None)
+                if self.verify_index is not None:
+                    self.verify_index.forget_version(version_id)
+        report['usage_bytes'] = usage
+
+        if not dry_run:
+            if self.verify_index is not None:
+                self.verify_index.save()
+            if self.store is not None and not unresolved:
+                self.collect_store(refs, report)
+        return report
+
+    def collect_store(self, refs, report):
+        # This root now only uses what its remaining versions reference; blobs no root
+        # uses and nothing links to any more are removed from the shared store
+        blobs = {}
+        for version_refs in refs.values():
+            blobs.update(version_refs)
+        self.store.set_refs(self.minecraft_directory, blobs)
+        for path in self.store.unreferenced():
+            try:
+                if os.stat(path).st_nlink == 1:
+                    os.remove(path)
+                    report['store_blobs_removed'] += 1
+            except OSError:
+                pass
+
+
+def parse_size(text):
+    # '20G', '512M', '1.5T' or plain bytes
+    text = str(text).strip().upper().rstrip('B')
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(float(text or 0))
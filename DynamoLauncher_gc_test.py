@@ -0,0 +1,106 @@
+# Regression tests for DynamoLauncher_gc: python -m unittest DynamoLauncher_gc_test
+import os
+import shutil
+import tempfile
+import unittest
+from os.path import join, isfile
+
+from DynamoLauncher_common import write_json_atomic
+from DynamoLauncher_gc import GarbageCollector
+from DynamoLauncher_versions import InstalledVersions
+
+OLD = 1000000000
+
+
+def write_file(path, data=b'x', mtime=OLD):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+class GarbageCollectorTest(unittest.TestCase):
+    def setUp(self):
+        self.root = os.path.abspath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.orphan = write_file(self.library('orphan/1.0/orphan-1.0.jar'))
+
+    def library(self, path):
+        return join(self.root, 'libraries', *path.split('/'))
+
+    def add_version(self, version_id, library, inherits_from=None):
+        # A version JSON with one library, both written as if installed long ago
+        data = {'id': version_id, 'libraries': [{
+            'name': library,
+            'downloads': {'artifact': {'path': library, 'url': f'https://example.invalid/{library}', 'size': 1}}
+        }]}
+        if inherits_from is not None:
+            data['inheritsFrom'] = inherits_from
+        path = join(self.root, 'versions', version_id, f'{version_id}.json')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_json_atomic(path, data)
+        os.utime(path, (OLD, OLD))
+        return write_file(self.library(library))
+
+    def collector(self, installed_versions):
+        return GarbageCollector(self.root, installed_versions)
+
+    def test_versions_missing_from_the_index_are_roots(self):
+        vanilla = self.add_version('1.0', 'vanilla/1.0/vanilla-1.0.jar')
+        installed_versions = InstalledVersions(self.root).load()
+        # Installed by another tool while the launcher was closed
+        forge = self.add_version('forge-1.0', 'forge/1.0/forge-1.0.jar', inherits_from='1.0')
+
+        report = self.collector(installed_versions).collect(dry_run=False)
+        self.assertEqual(report['orphan_files'], 1)
+        self.assertTrue(isfile(forge))
+        self.assertTrue(isfile(vanilla))
+        self.assertFalse(isfile(self.orphan))
+
+    def test_files_written_during_the_scan_are_kept(self):
+        installed_versions = InstalledVersions(self.root).load()
+        collector = self.collector(installed_versions)
+        reachability = collector.reachability
+        written = []
+
+        def scan_then_install():
+            # An install that starts once the reachable set has been computed
+            result = reachability()
+            written.append(write_file(self.library('new/1.0/new-1.0.jar'), mtime=None))
+            return result
+
+        collector.reachability = scan_then_install
+        report = collector.collect(dry_run=False)
+        self.assertEqual(report['orphan_files'], 1)
+        self.assertTrue(isfile(written[0]))
+        self.assertFalse(isfile(self.orphan))
+
+    def test_stale_entries_do_not_block_orphan_removal(self):
+        installed_versions = InstalledVersions(self.root).load()
+        installed_versions.record_install_started('failed')
+        installed_versions.record_install_started('installing')
+
+        report = self.collector(installed_versions).collect(dry_run=True)
+        self.assertEqual(report['unresolved'], [])
+        self.assertEqual(report['orphan_files'], 1)
+
+        report = self.collector(installed_versions).collect(dry_run=False, busy=lambda: {'installing'})
+        self.assertEqual(report['unresolved'], [])
+        self.assertFalse(isfile(self.orphan))
+        self.assertEqual(list(installed_versions.entries()), ['installing'])
+
+    def test_busy_versions_are_not_evicted(self):
+        self.add_version('1.0', 'a/1.0/a-1.0.jar')
+        self.add_version('2.0', 'b/2.0/b-2.0.jar')
+        installed_versions = InstalledVersions(self.root).load()
+
+        report = self.collector(installed_versions).collect(quota=1, dry_run=False, busy=lambda: {'1.0'})
+        self.assertEqual([evicted['version'] for evicted in report['evicted']], ['2.0'])
+        self.assertTrue(isfile(join(self.root, 'versions', '1.0', '1.0.json')))
+        self.assertFalse(os.path.exists(join(self.root, 'versions', '2.0')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,339 @@
+import os
+import platform
+import sys
+import threading
+import time
+import zipfile
+from os.path import join, isfile, isdir, relpath, dirname, getsize, normpath
+from pathlib import Path
+from urllib.parse import quote, urlencode
+
+from DynamoLauncher_common import read_json
+from DynamoLauncher_download import DownloadJob
+from DynamoLauncher_trace import record
+
+LIBRARIES_URL = 'https://libraries.minecraft.net/'
+RESOURCES_URL = 'https://resources.download.minecraft.net/'
+
+# minecraft_launcher_lib writes shared files (the Java runtime) without locking
+finish_lock = threading.Lock()
+
+# Assets the game can reach the title screen without; they are fetched after launch
+BACKGROUND_ASSET_PREFIXES = ('minecraft/sounds/', 'minecraft/music/', 'minecraft/resourcepacks/')
+
+
+def is_background_asset(name):
+    if name.startswith(BACKGROUND_ASSET_PREFIXES) or name.endswith('.ogg'):
+        return True
+    return name.startswith('minecraft/lang/') and name != 'minecraft/lang/en_us.json'
+
+
+def os_name():
+    if sys.platform == 'win32':
+        return 'windows'
+    if sys.platform == 'darwin':
+        return 'osx'
+    return 'linux'
+
+
+def arch_bits():
+    return '32' if platform.architecture()[0] == '32bit' else '64'
+
+
+def rule_matches(rule, features=None):
+    rule_os = rule.get('os', {})
+    if 'name' in rule_os and rule_os['name'] != os_name():
+        return False
+    if rule_os.get('arch') == 'x86' and arch_bits() != '32':
+        return False
+    for feature, value in rule.get('features', {}).items():
+        if (features or {}).get(feature, False) != value:
+            return False
+    return True
+
+
+def rules_allow(rules, features=None):
+    # Mojang semantics: disallowed unless a matching rule allows it, last match wins
+    if not rules:
+        return True
+    allowed = False
+    for rule in rules:
+        if rule_matches(rule, features):
+            allowed = rule['action'] == 'allow'
+    return allowed
+
+
+def maven_path(name):
+    parts = name.split(':')
+    group, artifact, version = parts[0], parts[1], parts[2]
+    classifier = f'-{parts[3]}' if len(parts) > 3 else ''
+    return f"{group.replace('.', '/')}/{artifact}/{version}/{artifact}-{version}{classifier}.jar"
+
+
+def library_downloads(library):
+    # Yields (artifact info, is_native) for every file a library needs on this OS
+    downloads = library.get('downloads')
+    if downloads is None:
+        path = maven_path(library['name'])
+        yield {'path': path, 'url': library.get('url', LIBRARIES_URL).rstrip('/') + '/' + path}, False
+        return
+
+    if 'artifact' in downloads:
+        yield downloads['artifact'], False
+
+    classifier = library.get('natives', {}).get(os_name())
+    if classifier is not None:
+        artifact = downloads.get('classifiers', {}).get(classifier.replace('${arch}', arch_bits()))
+        if artifact is not None:
+            yield artifact, True
+
+
+def mirror_base(mirror):
+    # A mirror is an HTTP URL or a local directory laid out like minecraft_directory
+    if mirror is None or '://' in mirror:
+        return mirror
+    if not isdir(mirror):
+        raise ValueError(f'Mirror directory not found: {mirror}')
+    return Path(mirror).resolve().as_uri()
+
+
+def mirror_url(mirror, minecraft_directory, path, upstream=None, sha1=None):
+    url = mirror.rstrip('/') + '/' + quote(relpath(path, minecraft_directory).replace('\\', '/'))
+    if mirror.startswith('http') and upstream is not None:
+        # Tells a read-through mirror where to fetch a miss and what to expect
+        query = {'src': upstream}
+        if sha1 is not None:
+            query['sha1'] = sha1
+        url += '?' + urlencode(query)
+    return url
+
+
+class InstallPlan:
+    def __init__(self, version_id):
+        self.version_id = version_id
+        self.chain = []
+        self.jobs = []
+        self.natives = []
+        self.paths = set()
+        self.java_component = None
+        self.legacy_assets = False
+        self.background_paths = set()
+        self.background = None
+        self.timings = {}
+
+    def add(self, job, background=False):
+        # A file any critical entry needs stays critical, whatever order they come in
+        if job.path not in self.paths:
+            self.paths.add(job.path)
+            self.jobs.append(job)
+            if background:
+                self.background_paths.add(job.path)
+        elif not background:
+            self.background_paths.discard(job.path)
+
+    @property
+    def critical_jobs(self):
+        return [job for job in self.jobs if job.path not in self.background_paths]
+
+    @property
+    def background_jobs(self):
+        return [job for job in self.jobs if job.path in self.background_paths]
+
+    @property
+    def total_size(self):
+        return sum(job.size for job in self.jobs)
+
+
+class InstallPlanner:
+    def __init__(self, minecraft_directory, engine, manifest_cache=None, resources_url=RESOURCES_URL, mirror=None):
+        self.minecraft_directory = minecraft_directory
+        self.engine = engine
+        self.manifest_cache = manifest_cache
+        self.resources_url = resources_url
+        self.mirror = mirror_base(mirror)
+
+    def job(self, url, path, sha1=None, size=0):
+        if self.mirror is not None:
+            url = mirror_url(self.mirror, self.minecraft_directory, path, url, sha1)
+        return DownloadJob(url, path, sha1, size)
+
+    def manifest_entry(self, version_id):
+        if self.manifest_cache is None:
+            return None
+        for version in self.manifest_cache.get_version_list():
+            if version['id'] == version_id:
+                return version
+        return None
+
+    def fetch_json(self, job):
+        # Small metadata files are fetched inline since the rest of the plan depends on them
+        if not isfile(job.path):
+            self.engine.fetch(job)
+        return read_json(job.path)
+
+    def version_json(self, version_id):
+        path = join(self.minecraft_directory, 'versions', version_id, f'{version_id}.json')
+        if isfile(path):
+            return read_json(path)
+
+        entry = self.manifest_entry(version_id)
+        if entry is None:
+            raise ValueError(f'Unknown Minecraft version: {version_id}')
+        return self.fetch_json(self.job(entry['url'], path, entry.get('sha1')))
+
+    def plan(self, version_id):
+        plan = InstallPlan(version_id)
+        self.add_version(plan, version_id)
+        return plan
+
+    def add_version(self, plan, version_id):
+        data = self.version_json(version_id)
+        plan.chain.append(version_id)
+        if plan.java_component is None and 'javaVersion' in data:
+            plan.java_component = data['javaVersion'].get('component')
+        if 'inheritsFrom' in data:
+            self.add_version(plan, data['inheritsFrom'])
+
+        for library in data.get('libraries', []):
+            if not rules_allow(library.get('rules')):
+                continue
+            for artifact, is_native in library_downloads(library):
+                path = join(self.minecraft_directory, 'libraries', artifact['path'])
+                plan.add(self.job(artifact['url'], path, artifact.get('sha1'), artifact.get('size', 0)))
+                if is_native:
+                    plan.natives.append((path, library.get('extract', {}).get('exclude', [])))
+
+        client = data.get('downloads', {}).get('client')
+        if client is not None:
+            path = join(self.minecraft_directory, 'versions', version_id, f'{version_id}.jar')
+            plan.add(self.job(client['url'], path, client.get('sha1'), client.get('size', 0)))
+
+        logging_file = data.get('logging', {}).get('client', {}).get('file')
+        if logging_file is not None:
+            path = join(self.minecraft_directory, 'assets', 'log_configs', logging_file['id'])
+            plan.add(self.job(logging_file['url'], path, logging_file.get('sha1'), logging_file.get('size', 0)))
+
+        if 'assetIndex' in data:
+            self.add_assets(plan, data['assetIndex'])
+
+    def add_assets(self, plan, asset_index):
+        path = join(self.minecraft_directory, 'assets', 'indexes', f"{asset_index['id']}.json")
+        index = self.fetch_json(self.job(asset_index['url'], path, asset_index.get('sha1'), asset_index.get('size', 0)))
+        if index.get('virtual') or index.get('map_to_resources'):
+            plan.legacy_assets = True
+        for name, item in index['objects'].items():
+            object_hash = item['hash']
+            plan.add(self.job(
+                f'{self.resources_url}{object_hash[:2]}/{object_hash}',
+                join(self.minecraft_directory, 'assets', 'objects', object_hash[:2], object_hash),
+                object_hash,
+                item.get('size', 0)
+            ), background=is_background_asset(name))
+
+
+def version_json_paths(minecraft_directory, chain):
+    return [join(minecraft_directory, 'versions', version_id, f'{version_id}.json') for version_id in chain]
+
+
+def extract_natives(plan, minecraft_directory):
+    natives_directory = join(minecraft_directory, 'versions', plan.version_id, 'natives')
+    for path, exclude in plan.natives:
+        with zipfile.ZipFile(path) as jar:
+            for member in jar.infolist():
+                if member.is_dir() or any(member.filename.startswith(prefix) for prefix in exclude):
+                    continue
+                target = normpath(join(natives_directory, member.filename))
+                if not target.startswith(natives_directory + os.sep):
+                    continue
+                if isfile(target) and getsize(target) == member.file_size:
+                    continue
+                os.makedirs(dirname(target), exist_ok=True)
+                with jar.open(member) as source, open(target, 'wb') as f:
+                    f.write(source.read())
+
+
+def install_runtime(plan, minecraft_directory, callback):
+    if plan.java_component is None:
+        return
+    from minecraft_launcher_lib.runtime import install_jvm_runtime
+
+    with finish_lock:
+        install_jvm_runtime(plan.java_component, minecraft_directory, callback=callback)
+
+
+def complete_version(plan, minecraft_directory, engine):
+    if engine.store is not None:
+        engine.store.add_refs(minecraft_directory, {job.sha1: job.size for job in plan.jobs if job.sha1})
+    if engine.index is not None:
+        engine.index.mark_version_complete(plan.version_id, version_json_paths(minecraft_directory, plan.chain))
+        engine.index.save()
+
+
+def install_version(version_id, minecraft_directory, engine, manifest_cache=None, callback=None, repair=False,
+                    mirror=None, background_callback=None):
+    # Returns the install plan, or None when the version was already complete. The
+    # game can start when this returns; plan.background is the batch still fetching
+    # the remaining assets and the version is marked complete once it finishes.
+    callback = callback or {}
+    index = engine.index
+    if index is not None and not repair and index.is_version_complete(version_id):
+        return None
+
+    start = time.perf_counter()
+    callback.get('setStatus', lambda value: None)('Resolving version')
+    plan = InstallPlanner(minecraft_directory, engine, manifest_cache, mirror=mirror).plan(version_id)
+    plan.timings['resolve'] = time.perf_counter() - start
+    record('install.resolve', start, version=version_id, files=len(plan.jobs))
+    try:
+        if plan.legacy_assets or len(plan.chain) > 1:
+            # Legacy asset layouts and inherited versions (jar copying) are left to
+            # minecraft_launcher_lib, which needs every file on disk first
+            from minecraft_launcher_lib.install import install_minecraft_version
+
+            phase = time.perf_counter()
+            engine.download(plan.jobs, callback, status=f'Downloading {len(plan.jobs)} files')
+            plan.timings['critical'] = time.perf_counter() - start
+            record('install.download', phase, version=version_id, files=len(plan.jobs))
+            phase = time.perf_counter()
+            with finish_lock:
+                install_minecraft_version(versionid=version_id, minecraft_directory=minecraft_directory,
+                                          callback=callback)
+            plan.timings['finish'] = time.perf_counter() - start
+            record('install.legacy', phase, version=version_id)
+            complete_version(plan, minecraft_directory, engine)
+            record('install', start, version=version_id)
+            return plan
+
+        critical = plan.critical_jobs
+        phase = time.perf_counter()
+        engine.download(critical, callback, status=f'Downloading {len(critical)} launch files')
+        plan.timings['critical'] = time.perf_counter() - start
+        record('install.download', phase, version=version_id, files=len(critical))
+        callback.get('setStatus', lambda value: None)('Extracting natives')
+        phase = time.perf_counter()
+        extract_natives(plan, minecraft_directory)
+        record('install.natives', phase, version=version_id, files=len(plan.natives))
+        phase = time.perf_counter()
+        install_runtime(plan, minecraft_directory, callback)
+        record('install.runtime', phase, version=version_id, component=plan.java_component)
+        plan.timings['finish'] = time.perf_counter() - start
+        record('install', start, version=version_id)
+    finally:
+        if index is not None:
+            index.save()
+
+    background = plan.background_jobs
+    phase = time.perf_counter()
+    plan.background = engine.submit(background, background_callback,
+                                    status=f'Downloading {len(background)} background assets', background=True)
+
+    def background_done(batch):
+        plan.timings['background'] = time.perf_counter() - start
+        record('install.assets', phase, version=version_id, files=len(background), errors=len(batch.errors))
+        if not batch.errors and not batch.cancelled:
+            complete_version(plan, minecraft_directory, engine)
+        elif index is not None:
+            index.save()
+
+    plan.background.add_done_callback(background_done)
+    return plan
@@ -0,0 +1,103 @@
+# JVM tuning profiles: heap size from physical memory and core count, plus a
+# collector and its flags. Only flags every Java version Minecraft ships with
+# (8 and newer) understands are used, so any profile works with any version.
+import ctypes
+import os
+import sys
+
+DEFAULT_PROFILE = 'balanced'
+
+MB = 1024 * 1024
+GB = 1024 * MB
+
+# Left to the OS, the launcher and the game's native allocations
+RESERVED_MEMORY = 2 * GB
+
+
+def physical_memory():
+    if sys.platform == 'win32':
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [
+                ('dwLength', ctypes.c_ulong),
+                ('dwMemoryLoad', ctypes.c_ulong),
+                ('ullTotalPhys', ctypes.c_ulonglong),
+                ('ullAvailPhys', ctypes.c_ulonglong),
+                ('ullTotalPageFile', ctypes.c_ulonglong),
+                ('ullAvailPageFile', ctypes.c_ulonglong),
+                ('ullTotalVirtual', ctypes.c_ulonglong),
+                ('ullAvailVirtual', ctypes.c_ulonglong),
+                ('ullAvailExtendedVirtual', ctypes.c_ulonglong)
+            ]
+
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(MemoryStatus)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys
+        return None
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def heap_size(memory, fraction, minimum, maximum):
+    # fraction of physical memory, clamped, never eating into RESERVED_MEMORY when avoidable
+    if memory is None:
+        return minimum
+    size = min(max(int(memory * fraction), minimum), maximum)
+    if memory - size < RESERVED_MEMORY:
+        size = max(memory - RESERVED_MEMORY, min(minimum, memory // 2))
+    # Whole 256 MB steps keep the flags readable
+    return max(size // (256 * MB) * 256 * MB, 256 * MB)
+
+
+def low_memory(memory, cores):
+    heap = heap_size(memory, 1 / 8, 1 * GB, 2 * GB)
+    return [f'-Xms{heap // 2 // MB}m', f'-Xmx{heap // MB}m', '-XX:+UseSerialGC', '-Xss512k']
+
+
+def balanced(memory, cores):
+    heap = heap_size(memory, 1 / 4, 2 * GB, 4 * GB)
+    return [
+        f'-Xms{heap // 2 // MB}m', f'-Xmx{heap // MB}m',
+        '-XX:+UseG1GC', '-XX:MaxGCPauseMillis=200', '-XX:+ParallelRefProcEnabled', '-XX:+DisableExplicitGC'
+    ]
+
+
+def high_throughput(memory, cores):
+    heap = heap_size(memory, 1 / 3, 3 * GB, 8 * GB)
+    return [
+        f'-Xms{heap // MB}m', f'-Xmx{heap // MB}m',
+        '-XX:+UseParallelGC', f'-XX:ParallelGCThreads={max(1, cores)}', '-XX:+DisableExplicitGC'
+    ]
+
+
+def low_pause(memory, cores):
+    # G1 with a young generation sized for Minecraft's allocation rate and an
+    # early marking start, so collections stay short instead of rare
+    heap = heap_size(memory, 1 / 3, 3 * GB, 8 * GB)
+    return [
+        f'-Xms{heap // MB}m', f'-Xmx{heap // MB}m',
+        '-XX:+UseG1GC', '-XX:MaxGCPauseMillis=50', '-XX:+ParallelRefProcEnabled', '-XX:+DisableExplicitGC',
+        '-XX:+UnlockExperimentalVMOptions', '-XX:G1NewSizePercent=30', '-XX:G1MaxNewSizePercent=40',
+        '-XX:G1HeapRegionSize=8M', '-XX:G1ReservePercent=20', '-XX:InitiatingHeapOccupancyPercent=15',
+        f'-XX:ConcGCThreads={max(1, cores // 4)}'
+    ]
+
+
+PROFILES = {
+    'low-memory': low_memory,
+    'balanced': balanced,
+    'high-throughput': high_throughput,
+    'low-pause': low_pause,
+    # Whatever the JVM picks on its own
+    'default': lambda memory, cores: []
+}
+
+
+def jvm_arguments(profile=DEFAULT_PROFILE, memory=None, cores=None):
+    if profile not in PROFILES:
+        raise ValueError(f'Unknown JVM profile: {profile}')
+    memory = physical_memory() if memory is None else memory
+    cores = (os.cpu_count() or 2) if cores is None else cores
+    return PROFILES[profile](memory, cores)
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+from os.path import join
+
+from DynamoLauncher_common import read_json, write_json_atomic
+from DynamoLauncher_install import os_name, arch_bits, rules_allow
+from DynamoLauncher_trace import span
+
+# Per-launch values are baked into the cached command as placeholders and
+# substituted on every launch
+PLACEHOLDERS = {
+    'username': '__DYNAMO_USERNAME__',
+    'uuid': '__DYNAMO_UUID__',
+    'token': '__DYNAMO_TOKEN__'
+}
+
+
+def read_version_chain(minecraft_directory, version_id):
+    chain = []
+    while version_id is not None:
+        path = join(minecraft_directory, 'versions', version_id, f'{version_id}.json')
+        with open(path, 'rb') as f:
+            raw = f.read()
+        data = json.loads(raw)
+        chain.append((version_id, raw, data))
+        version_id = data.get('inheritsFrom')
+    return chain
+
+
+class LaunchPlanCache:
+    def __init__(self, minecraft_directory):
+        self.minecraft_directory = minecraft_directory
+
+    def plan_path(self, version_id):
+        return join(self.minecraft_directory, 'versions', version_id, 'launch_plan.json')
+
+    def plan_key(self, version_id, options):
+        key = hashlib.sha1()
+        for _, raw, data in read_version_chain(self.minecraft_directory, version_id):
+            key.update(raw)
+            libraries = sorted(library['name'] for library in data.get('libraries', [])
+                               if rules_allow(library.get('rules')))
+            key.update('\n'.join(libraries).encode())
+        key.update(f'{self.minecraft_directory}|{os_name()}|{arch_bits()}'.encode())
+        stable_options = {name: value for name, value in options.items() if name not in PLACEHOLDERS}
+        key.update(json.dumps(stable_options, sort_keys=True).encode())
+        return key.hexdigest()
+
+    def build(self, version_id, options):
+        from minecraft_launcher_lib.command import get_minecraft_command
+
+        template_options = dict(options)
+        template_options.update(PLACEHOLDERS)
+        return get_minecraft_command(
+            version=version_id,
+            minecraft_directory=self.minecraft_directory,
+            options=template_options
+        )
+
+    def substitute(self, command, options):
+        result = []
+        for argument in command:
+            for name, placeholder in PLACEHOLDERS.items():
+                if placeholder in argument:
+                    argument = argument.replace(placeholder, options.get(name, ''))
+            result.append(argument)
+        return result
+
+    def get_command(self, version_id, options):
+        with span('launch.command', version=version_id) as command_span:
+            key = self.plan_key(version_id, options)
+            path = self.plan_path(version_id)
+            cached = read_json(path)
+            if cached is not None and cached.get('key') == key:
+                command = cached['command']
+            else:
+                command = self.build(version_id, options)
+                write_json_atomic(path, {'key': key, 'command': command})
+            command_span.set(cached=cached is not None and cached.get('key') == key)
+            return self.substitute(command, options)
+
+    def invalidate(self, version_id):
+        try:
+            os.remove(self.plan_path(version_id))
+        except FileNotFoundError:
+            pass
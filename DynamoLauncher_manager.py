@@ -0,0 +1,239 @@
+import itertools
+import subprocess
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid1
+
+from DynamoLauncher_cds import ClassDataSharing
+from DynamoLauncher_install import install_version
+from DynamoLauncher_jvm import DEFAULT_PROFILE, jvm_arguments
+from DynamoLauncher_launchplan import LaunchPlanCache
+from DynamoLauncher_progress import ProgressAggregator
+from DynamoLauncher_supervisor import GameSupervisor, session_log_path, prune_sessions
+from DynamoLauncher_trace import record
+
+CREATE_NO_WINDOW = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+QUEUED = 'queued'
+INSTALLING = 'installing'
+RUNNING = 'running'
+EXITED = 'exited'
+FAILED = 'failed'
+
+
+class Instance:
+    def __init__(self, instance_id, version_id, username):
+        self.id = instance_id
+        self.version_id = version_id
+        self.username = username
+        self.state = QUEUED
+        self.process = None
+        self.supervisor = None
+        self.telemetry = None
+        self.cds = None
+        # What the prefetcher had done for this version before Play, see DynamoLauncher_prefetch
+        self.prefetch = None
+        self.returncode = None
+        self.error = None
+        self.started_at = None
+        self.exited_at = None
+        # Download batch for assets still arriving after launch
+        self.background = None
+
+    @property
+    def background_active(self):
+        return self.background is not None and not self.background.finished.is_set()
+
+    def __repr__(self):
+        return f'Instance({self.id}, {self.version_id!r}, {self.state})'
+
+
+class LaunchManager:
+    # Installs run on a bounded pool (the queue is the pool's backlog), games are
+    # polled and sampled by a single reaper thread instead of a blocked thread per process
+    def __init__(self, minecraft_directory, engine, manifest_cache=None, max_installs=2, mirror=None,
+                 on_state=None, on_progress=None, on_background_progress=None, poll_interval=0.5,
+                 sample_interval=5.0, jvm_profile=DEFAULT_PROFILE, class_data_sharing=True, installed_versions=None):
+        self.minecraft_directory = minecraft_directory
+        self.engine = engine
+        self.manifest_cache = manifest_cache
+        self.mirror = mirror
+        self.on_state = on_state or (lambda instance: None)
+        self.on_progress = on_progress or (lambda instance, progress, maximum, label, stats: None)
+        self.on_background_progress = on_background_progress or (lambda instance, progress, maximum, label, stats: None)
+        self.poll_interval = poll_interval
+        self.sample_interval = sample_interval
+        self.jvm_profile = jvm_profile
+        self.class_data_sharing = class_data_sharing
+        self.installed_versions = installed_versions
+
+        self.executor = ThreadPoolExecutor(max_workers=max_installs, thread_name_prefix='install')
+        self.launch_plans = LaunchPlanCache(minecraft_directory)
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.instances = {}
+        self.running = []
+
+        self.stopping = threading.Event()
+        self.reaper = threading.Thread(target=self.reap, name='reaper', daemon=True)
+        self.reaper.start()
+
+    def submit(self, version_id, username='', prefetch=None):
+        instance = Instance(next(self.ids), version_id, username)
+        instance.prefetch = prefetch
+        with self.lock:
+            self.instances[instance.id] = instance
+        self.set_state(instance, QUEUED)
+        self.executor.submit(self.install_and_launch, instance)
+        return instance
+
+    def set_state(self, instance, state):
+        instance.state = state
+        self.on_state(instance)
+
+    def instances_in(self, *states):
+        with self.lock:
+            return [instance for instance in self.instances.values() if instance.state in states]
+
+    def background_downloads(self):
+        with self.lock:
+            return [instance for instance in self.instances.values() if instance.background_active]
+
+    def install_and_launch(self, instance):
+        start = time.perf_counter()
+        progress = background_progress = plan = None
+        try:
+            # Anything that can fail happens in here, so the instance always ends up FAILED
+            from random_username.generate import generate_username
+
+            progress = ProgressAggregator(lambda *update: self.on_progress(instance, *update))
+            background_progress = ProgressAggregator(lambda *update: self.on_background_progress(instance, *update))
+            self.set_state(instance, INSTALLING)
+            progress.start()
+            background_progress.start()
+            if self.installed_versions is not None:
+                self.installed_versions.record_install_started(instance.version_id)
+            # Returns None without touching the disk when the version is already complete,
+            # otherwise as soon as the launch-critical files are in place
+            plan = install_version(
+                instance.version_id,
+                self.minecraft_directory,
+                self.engine,
+                manifest_cache=self.manifest_cache,
+                callback=progress.callback(),
+                mirror=self.mirror,
+                background_callback=background_progress.callback()
+            )
+            if plan is not None:
+                # Fresh install, natives or the Java runtime may have moved
+                self.launch_plans.invalidate(instance.version_id)
+            if self.installed_versions is not None:
+                self.installed_versions.record_install(instance.version_id, plan)
+
+            if not instance.username:
+                instance.username = generate_username()[0]
+
+            options = {
+                'username': instance.username,
+                'uuid': str(uuid1()),
+                'token': '',
+                'jvmArguments': jvm_arguments(self.jvm_profile)
+            }
+            command = self.launch_plans.get_command(instance.version_id, options)
+            if self.class_data_sharing:
+                instance.cds = ClassDataSharing(self.minecraft_directory, instance.version_id)
+                command = instance.cds.prepare(command)
+            prune_sessions(self.minecraft_directory)
+            instance.supervisor = GameSupervisor(
+                command,
+                session_log_path(self.minecraft_directory, instance.version_id, instance.id),
+                sample_interval=self.sample_interval,
+                creationflags=CREATE_NO_WINDOW
+            ).start()
+            instance.process = instance.supervisor.process
+        except Exception as e:
+            instance.error = e
+            self.set_state(instance, FAILED)
+            return
+        finally:
+            if progress is not None:
+                progress.stop()
+            if background_progress is not None:
+                self.track_background(instance, plan, background_progress)
+
+        instance.started_at = time.time()
+        if self.installed_versions is not None:
+            self.installed_versions.record_played(instance.version_id)
+        with self.lock:
+            self.running.append(instance)
+        # Play pressed (install picked up) to JVM started
+        record('play', start, version=instance.version_id, instance=instance.id)
+        self.set_state(instance, RUNNING)
+
+    def track_background(self, instance, plan, progress):
+        if plan is None or plan.background is None:
+            progress.stop()
+            return
+        instance.background = plan.background
+
+        def background_done(batch):
+            progress.stop()
+            if instance.state != FAILED:
+                self.on_state(instance)
+
+        plan.background.add_done_callback(background_done)
+
+    def reap(self):
+        while not self.stopping.wait(self.poll_interval):
+            with self.lock:
+                running = list(self.running)
+            for instance in running:
+                try:
+                    instance.supervisor.sample()
+                except Exception as e:
+                    # A failed resource sample must not keep the exit from being noticed
+                    self.reap_error(instance, e)
+                try:
+                    returncode = instance.supervisor.poll()
+                except Exception as e:
+                    self.reap_error(instance, e)
+                    continue
+                if returncode is not None:
+                    self.end_instance(instance, returncode)
+
+    def end_instance(self, instance, returncode):
+        instance.returncode = returncode
+        instance.exited_at = time.time()
+        try:
+            try:
+                instance.telemetry = instance.supervisor.finish()
+            except Exception as e:
+                # Parsing /proc or the log failed, what was sampled so far is still reported
+                self.reap_error(instance, e)
+                instance.telemetry = instance.supervisor.summary()
+            if instance.cds is not None:
+                instance.cds.finish(returncode, instance.telemetry)
+        except Exception as e:
+            # The game is gone either way, its slot is freed below
+            self.reap_error(instance, e)
+        with self.lock:
+            self.running.remove(instance)
+        self.set_state(instance, EXITED)
+
+    def reap_error(self, instance, error):
+        # Printed and kept on the instance; one broken game must not stop the only reaper thread
+        instance.error = error
+        traceback.print_exception(type(error), error, error.__traceback__)
+
+    def shutdown(self):
+        # Running games are left alone, only the launcher's own threads stop. Cancelled
+        # background assets leave the version incomplete and are fetched on the next Play
+        self.stopping.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        with self.lock:
+            instances = list(self.instances.values())
+        for instance in instances:
+            if instance.background is not None:
+                instance.background.cancel()
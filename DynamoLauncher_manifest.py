@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from os.path import join
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from DynamoLauncher_common import MANIFEST_URL, CACHE_FOLDER, cache_directory, read_json, write_json_atomic
+from DynamoLauncher_trace import span
+
+DEFAULT_TTL = 3600
+MANIFEST_FILE = 'version_manifest_v2.json'
+
+
+def mirror_manifest_url(mirror):
+    # Mirrors expose the launcher_cache layout, so the manifest sits where we cache it
+    return f"{mirror.rstrip('/')}/{CACHE_FOLDER}/{MANIFEST_FILE}"
+
+
+class ManifestCache:
+    def __init__(self, minecraft_directory, url=MANIFEST_URL, ttl=DEFAULT_TTL,
+                 stale_while_revalidate=True, timeout=10):
+        self.url = url
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.timeout = timeout
+
+        folder = cache_directory(minecraft_directory)
+        self.path = join(folder, MANIFEST_FILE)
+        self.meta_path = join(folder, 'version_manifest_v2.meta.json')
+
+        self.manifest = None
+        self.meta = None
+        self.lock = threading.Lock()
+        self.revalidating = False
+        self.pending_callbacks = []
+
+    def load_cached(self):
+        with self.lock:
+            if self.manifest is None:
+                self.manifest = read_json(self.path)
+                self.meta = read_json(self.meta_path, {})
+                # A meta file from another URL (e.g. a mirror) must not validate this one
+                if self.manifest is not None and self.meta.get('url') != self.url:
+                    self.meta = {'url': self.url, 'fetched_at': 0}
+            return self.manifest
+
+    def is_fresh(self):
+        self.load_cached()
+        if self.manifest is None:
+            return False
+        age = time.time() - self.meta.get('fetched_at', 0)
+        return 0 <= age < self.ttl
+
+    def revalidate(self):
+        self.load_cached()
+        headers = {'Accept': 'application/json'}
+        if self.manifest is not None:
+            if self.meta.get('etag'):
+                headers['If-None-Match'] = self.meta['etag']
+            if self.meta.get('last_modified'):
+                headers['If-Modified-Since'] = self.meta['last_modified']
+
+        try:
+            with span('manifest.fetch', 'network', url=self.url) as fetch_span, \
+                    urlopen(Request(self.url, headers=headers), timeout=self.timeout) as response:
+                body = response.read()
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+                fetch_span.set(bytes=len(body))
+        except HTTPError as e:
+            if e.code != 304 or self.manifest is None:
+                raise
+            with self.lock:
+                self.meta['fetched_at'] = time.time()
+                write_json_atomic(self.meta_path, self.meta)
+            return self.manifest, False
+
+        manifest = json.loads(body)
+        meta = {
+            'url': self.url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': time.time()
+        }
+        with self.lock:
+            changed = manifest != self.manifest
+            self.manifest = manifest
+            self.meta = meta
+            write_json_atomic(self.path, manifest)
+            write_json_atomic(self.meta_path, meta)
+        return manifest, changed
+
+    def revalidate_async(self, on_update=None):
+        # Callers arriving while a refresh is in flight are notified by that refresh
+        with self.lock:
+            if on_update is not None:
+                self.pending_callbacks.append(on_update)
+            if self.revalidating:
+                return
+            self.revalidating = True
+
+        def worker():
+            try:
+                manifest, changed = self.revalidate()
+            except (URLError, OSError, ValueError):
+                manifest, changed = None, False
+            with self.lock:
+                self.revalidating = False
+                callbacks, self.pending_callbacks = self.pending_callbacks, []
+            if changed:
+                for callback in callbacks:
+                    callback(manifest['versions'])
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def prefetch(self):
+        # Warm-up for startup: parse the cached copy and start a refresh if it
+        # is due, never waiting on the network
+        if not self.is_fresh():
+            self.revalidate_async()
+        return self.load_cached()
+
+    def get_manifest(self, on_update=None):
+        # With on_update set this never blocks on the network: fresh data is
+        # handed to the callback from a background thread instead
+        cached = self.load_cached()
+        if cached is not None and self.is_fresh():
+            return cached
+
+        if on_update is not None and (cached is None or self.stale_while_revalidate):
+            self.revalidate_async(on_update)
+            return cached
+
+        try:
+            return self.revalidate()[0]
+        except (URLError, OSError, ValueError):
+            if cached is None:
+                raise
+            return cached
+
+    def get_version_list(self, on_update=None):
+        manifest = self.get_manifest(on_update)
+        if manifest is None:
+            return []
+        return manifest['versions']
@@ -0,0 +1,320 @@
+# Read-through caching mirror that serves the minecraft_directory layout over HTTP:
+#   GET /assets/objects/ab/<hash>, /libraries/..., /versions/<id>/<id>.json|jar,
+#       /launcher_cache/version_manifest_v2.json
+# Misses are fetched upstream once (from ?src= or derived from the path) and
+# streamed to every client waiting on the same file while they download.
+import hashlib
+import os
+import shutil
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os.path import join, isfile, normpath, dirname, relpath
+from urllib.parse import urlsplit, parse_qs, unquote
+from urllib.request import urlopen
+
+from DynamoLauncher_common import CACHE_FOLDER, MANIFEST_URL, read_json
+from DynamoLauncher_install import LIBRARIES_URL, RESOURCES_URL
+from DynamoLauncher_manifest import ManifestCache, MANIFEST_FILE
+
+CHUNK_SIZE = 64 * 1024
+
+UPSTREAM_HOSTS = {
+    'launchermeta.mojang.com',
+    'piston-meta.mojang.com',
+    'piston-data.mojang.com',
+    'launcher.mojang.com',
+    'libraries.minecraft.net',
+    'resources.download.minecraft.net'
+}
+
+SERVED_ASSET_FOLDERS = ('objects', 'indexes', 'log_configs')
+
+
+class Transfer:
+    # One upstream fetch; chunks are kept in memory while it runs so any number
+    # of clients can tail it, and written to a .part file renamed at the end
+    def __init__(self, path):
+        self.path = path
+        self.part_path = f'{path}.mirror.part'
+        self.condition = threading.Condition()
+        self.chunks = []
+        self.written = 0
+        self.length = None
+        self.started = False
+        self.done = False
+        self.error = None
+
+    def wait_started(self):
+        with self.condition:
+            while not self.started:
+                self.condition.wait()
+            return self.error is None
+
+    def stream_to(self, wfile):
+        sent = 0
+        while True:
+            with self.condition:
+                while sent == len(self.chunks) and not self.done:
+                    self.condition.wait()
+                pending = self.chunks[sent:]
+                finished = self.done
+                failed = self.error is not None
+            if failed:
+                return False
+            for chunk in pending:
+                wfile.write(chunk)
+            sent += len(pending)
+            if finished and sent == len(self.chunks):
+                return True
+
+
+class MirrorServer:
+    def __init__(self, minecraft_directory, host='0.0.0.0', port=8080, manifest_url=MANIFEST_URL,
+                 resources_url=RESOURCES_URL, libraries_url=LIBRARIES_URL, allowed_hosts=(), timeout=30):
+        self.root = os.path.abspath(minecraft_directory)
+        self.resources_url = resources_url
+        self.libraries_url = libraries_url
+        self.allowed_hosts = UPSTREAM_HOSTS | set(allowed_hosts)
+        self.timeout = timeout
+        self.manifest_cache = ManifestCache(minecraft_directory, url=manifest_url)
+
+        self.lock = threading.Lock()
+        self.manifest_lock = threading.Lock()
+        self.transfers = {}
+        self.stats = {'hits': 0, 'misses': 0, 'shared': 0, 'upstream_bytes': 0}
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                server.handle(self)
+
+            def do_HEAD(self):
+                server.handle(self, head=True)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        if host == '0.0.0.0':
+            host = '127.0.0.1'
+        return f'http://{host}:{port}'
+
+    def local_path(self, relative):
+        # Only the install layout is served, never logs, traces or anything else under the root
+        path = normpath(join(self.root, unquote(relative).lstrip('/')))
+        if not path.startswith(self.root + os.sep):
+            return None
+        parts = relpath(path, self.root).split(os.sep)
+        if parts[0] == 'assets' and len(parts) > 2 and parts[1] in SERVED_ASSET_FOLDERS:
+            return path
+        if parts[0] == 'libraries' and len(parts) > 1:
+            return path
+        if parts[0] == 'versions' and len(parts) == 3 and parts[2] in (f'{parts[1]}.json', f'{parts[1]}.jar'):
+            return path
+        if parts == [CACHE_FOLDER, MANIFEST_FILE]:
+            return path
+        return None
+
+    def upstream_url(self, relative, src):
+        # The configured upstreams win for every path they can be derived for;
+        # the client's src is only used for the rest
+        url = self.derived_url(relative, src)
+        if url is not None:
+            return url
+        if src is not None and urlsplit(src).netloc in self.allowed_hosts:
+            return src
+        return None
+
+    def derived_url(self, relative, src):
+        parts = relative.strip('/').split('/')
+        if parts[:2] == ['assets', 'objects'] and len(parts) == 4:
+            return f'{self.resources_url}{parts[2]}/{parts[3]}'
+        if parts[0] == 'libraries' and len(parts) > 1:
+            # Libraries from other repositories (Forge, Fabric...) keep their own src
+            if src is None or src.startswith(LIBRARIES_URL):
+                return self.libraries_url + '/'.join(parts[1:])
+            return None
+        if parts[0] == 'versions' and len(parts) == 3:
+            version_id = parts[1]
+            if parts[2] == f'{version_id}.json':
+                for version in self.manifest_cache.get_version_list():
+                    if version['id'] == version_id:
+                        return version['url']
+            elif parts[2] == f'{version_id}.jar':
+                data = read_json(join(self.root, 'versions', version_id, f'{version_id}.json'))
+                if data is not None and 'client' in data.get('downloads', {}):
+                    return data['downloads']['client']['url']
+        return None
+
+    def handle(self, handler, head=False):
+        parts = urlsplit(handler.path)
+        query = parse_qs(parts.query)
+        relative = parts.path
+
+        manifest_failed = False
+        if relative.strip('/') == f'{CACHE_FOLDER}/{MANIFEST_FILE}':
+            # The manifest is revalidated against upstream on its own TTL, by one client at a time
+            with self.manifest_lock:
+                try:
+                    self.manifest_cache.get_manifest()
+                except (OSError, ValueError):
+                    # Upstream down or answering garbage, a copy fetched earlier is still served
+                    manifest_failed = True
+
+        path = self.local_path(relative)
+        if path is None:
+            return self.send_empty(handler, 404)
+
+        if isfile(path):
+            with self.lock:
+                self.stats['hits'] += 1
+            return self.send_file(handler, path, head)
+        if manifest_failed:
+            return self.send_empty(handler, 502)
+
+        src = query.get('src', [None])[0]
+        try:
+            url = self.upstream_url(relative, src)
+        except (OSError, ValueError):
+            # The version manifest could not be fetched or parsed
+            return self.send_empty(handler, 502)
+        if url is None:
+            return self.send_empty(handler, 404)
+
+        sha1 = query.get('sha1', [None])[0]
+        transfer, owner = self.transfer_for(path)
+        if owner:
+            threading.Thread(target=self.fetch_upstream, args=(transfer, url, sha1), daemon=True).start()
+        else:
+            with self.lock:
+                self.stats['shared'] += 1
+
+        if not transfer.wait_started():
+            return self.send_empty(handler, 502)
+
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/octet-stream')
+        if transfer.length is not None:
+            handler.send_header('Content-Length', str(transfer.length))
+        else:
+            handler.send_header('Connection', 'close')
+            handler.close_connection = True
+        handler.end_headers()
+        if not head and not transfer.stream_to(handler.wfile):
+            handler.close_connection = True
+
+    def transfer_for(self, path):
+        with self.lock:
+            transfer = self.transfers.get(path)
+            if transfer is not None:
+                return transfer, False
+            transfer = self.transfers[path] = Transfer(path)
+            self.stats['misses'] += 1
+            return transfer, True
+
+    def fetch_upstream(self, transfer, url, sha1):
+        digest = hashlib.sha1()
+        try:
+            os.makedirs(dirname(transfer.path), exist_ok=True)
+            with urlopen(url, timeout=self.timeout) as response, open(transfer.part_path, 'wb') as f:
+                length = response.headers.get('Content-Length')
+                with transfer.condition:
+                    transfer.length = int(length) if length is not None else None
+                    transfer.started = True
+                    transfer.condition.notify_all()
+                for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    with transfer.condition:
+                        transfer.chunks.append(chunk)
+                        transfer.written += len(chunk)
+                        transfer.condition.notify_all()
+
+            if sha1 is not None and digest.hexdigest() != sha1:
+                raise ValueError(f'{url}: sha1 mismatch')
+            os.replace(transfer.part_path, transfer.path)
+            with self.lock:
+                self.stats['upstream_bytes'] += transfer.written
+        except (OSError, ValueError) as e:
+            with transfer.condition:
+                transfer.error = e
+        finally:
+            with transfer.condition:
+                transfer.started = True
+                transfer.done = True
+                transfer.condition.notify_all()
+            with self.lock:
+                del self.transfers[transfer.path]
+            if transfer.error is not None and isfile(transfer.part_path):
+                os.remove(transfer.part_path)
+
+    def send_empty(self, handler, status):
+        handler.send_response(status)
+        handler.send_header('Content-Length', '0')
+        handler.end_headers()
+
+    def send_file(self, handler, path, head=False):
+        stat = os.stat(path)
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        if handler.headers.get('If-None-Match') == etag:
+            handler.send_response(304)
+            handler.send_header('ETag', etag)
+            handler.end_headers()
+            return
+
+        size = stat.st_size
+        offset = 0
+        range_header = handler.headers.get('Range', '')
+        if range_header.startswith('bytes=') and range_header.endswith('-') and range_header[6:-1].isdecimal():
+            # Only open-ended ranges are resumed, any other Range is ignored and the whole file sent
+            offset = int(range_header[6:-1])
+            if offset >= size:
+                handler.send_response(416)
+                handler.send_header('Content-Range', f'bytes */{size}')
+                handler.send_header('Content-Length', '0')
+                handler.end_headers()
+                return
+
+        handler.send_response(206 if offset else 200)
+        handler.send_header('Content-Type', 'application/octet-stream')
+        handler.send_header('Content-Length', str(size - offset))
+        if offset:
+            handler.send_header('Content-Range', f'bytes {offset}-{size - 1}/{size}')
+        handler.send_header('Accept-Ranges', 'bytes')
+        handler.send_header('ETag', etag)
+        handler.send_header('Last-Modified', formatdate(stat.st_mtime, usegmt=True))
+        handler.end_headers()
+        if head:
+            return
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            shutil.copyfileobj(f, handler.wfile, CHUNK_SIZE)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,139 @@
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt, pyqtSignal
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QCheckBox, QListView
+
+from DynamoLauncher_versions import VersionIndex
+
+# Manifest version types and their filter labels, only releases are shown by default
+VERSION_TYPES = (
+    ('release', 'Releases'),
+    ('snapshot', 'Snapshots'),
+    ('old_beta', 'Beta'),
+    ('old_alpha', 'Alpha')
+)
+
+# Rows handed to the view per fetchMore(), the view asks for more while scrolling
+FETCH_BATCH = 100
+
+
+class VersionListModel(QAbstractListModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.version_index = VersionIndex([])
+        self.rows = []
+        self.loaded = 0
+
+    def set_rows(self, version_index, rows):
+        self.beginResetModel()
+        self.version_index = version_index
+        self.rows = rows
+        self.loaded = min(FETCH_BATCH, len(rows))
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded < len(self.rows)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(FETCH_BATCH, len(self.rows) - self.loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def ensure_loaded(self, row):
+        while row >= self.loaded and self.canFetchMore():
+            self.fetchMore()
+
+    def version(self, row):
+        return self.version_index.versions[self.rows[row]]
+
+    def find(self, version_id):
+        for row, version_row in enumerate(self.rows):
+            if self.version_index.versions[version_row]['id'] == version_id:
+                return row
+        return -1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self.loaded:
+            return None
+        version = self.version(index.row())
+        if role == Qt.DisplayRole:
+            return version['id']
+        if role == Qt.ToolTipRole:
+            return f"{version['type']}, {version.get('releaseTime', '')[:10]}"
+        if role == Qt.UserRole:
+            return version
+        return None
+
+
+class VersionPicker(QWidget):
+    selection_changed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.version_index = VersionIndex([])
+
+        self.search = QLineEdit(self)
+        self.search.setPlaceholderText('Search versions')
+        self.search.setClearButtonEnabled(True)
+        self.search.textChanged.connect(self.refresh)
+
+        self.type_checkboxes = {}
+        types_layout = QHBoxLayout()
+        types_layout.setContentsMargins(0, 0, 0, 0)
+        for version_type, label in VERSION_TYPES:
+            checkbox = QCheckBox(label, self)
+            checkbox.setChecked(version_type == 'release')
+            checkbox.stateChanged.connect(self.refresh)
+            self.type_checkboxes[version_type] = checkbox
+            types_layout.addWidget(checkbox)
+
+        self.model = VersionListModel(self)
+        self.view = QListView(self)
+        # Every row has the same height, so the view never measures rows it does not show
+        self.view.setUniformItemSizes(True)
+        self.view.setModel(self.model)
+        self.view.selectionModel().currentChanged.connect(self.current_changed)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.search)
+        layout.addLayout(types_layout)
+        layout.addWidget(self.view)
+
+    def set_versions(self, versions):
+        self.version_index = VersionIndex(versions)
+        self.refresh()
+
+    def selected_types(self):
+        return [version_type for version_type, checkbox in self.type_checkboxes.items() if checkbox.isChecked()]
+
+    def selected_version(self):
+        index = self.view.currentIndex()
+        if not index.isValid():
+            return None
+        return self.model.version(index.row())['id']
+
+    def refresh(self):
+        # Keeps the selection when it is still in the filtered list
+        selected = self.selected_version()
+        rows = self.version_index.filter(self.selected_types(), self.search.text())
+        self.model.set_rows(self.version_index, rows)
+        if selected is not None:
+            row = self.model.find(selected)
+            if row >= 0:
+                self.model.ensure_loaded(row)
+                self.view.setCurrentIndex(self.model.index(row))
+                return
+            self.selection_changed.emit('')
+
+    def clear_selection(self):
+        self.view.setCurrentIndex(QModelIndex())
+
+    def current_changed(self, current, previous):
+        self.selection_changed.emit(self.model.version(current.row())['id'] if current.isValid() else '')
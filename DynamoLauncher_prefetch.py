@@ -0,0 +1,192 @@
+# Speculative install work for the version the user has selected but not
+# launched yet: version JSON, asset index and the launch-critical files are
+# fetched or verified on the engine's low-priority pool. Play reuses all of it
+# through the verify index and the engine's in-flight de-duplication.
+import shutil
+import threading
+import time
+from os.path import join, isdir
+
+from DynamoLauncher_common import cache_directory, read_json, write_json_atomic
+from DynamoLauncher_install import InstallPlanner
+
+MAX_HISTORY = 50
+
+
+class PrefetchSession:
+    def __init__(self, version_id):
+        self.version_id = version_id
+        self.state = 'waiting'
+        self.started_at = time.monotonic()
+        self.batch = None
+        self.files = 0
+        self.bytes = 0
+        self.files_done = 0
+        self.bytes_fetched = 0
+        self.cancelled = False
+        self.claimed = False
+        # What this prefetch added, undone when it is dropped without downloading anything
+        self.recorded = False
+        self.created_directory = False
+        self.lock = threading.Lock()
+
+    def callback(self):
+        def set_progress(value):
+            with self.lock:
+                self.files_done = value
+
+        def add_bytes(value):
+            with self.lock:
+                self.bytes_fetched += value
+
+        return {'setProgress': set_progress, 'addBytes': add_bytes}
+
+    def cancel(self):
+        self.cancelled = True
+        if self.state in ('waiting', 'planning', 'downloading'):
+            self.state = 'cancelled'
+        if self.batch is not None:
+            self.batch.cancel()
+
+    def report(self):
+        with self.lock:
+            return {
+                'version': self.version_id,
+                'state': self.state,
+                'seconds': round(time.monotonic() - self.started_at, 2),
+                'files': self.files,
+                'files_done': self.files_done,
+                'bytes': self.bytes,
+                'bytes_fetched': self.bytes_fetched,
+                'percent': round(self.files_done * 100 / self.files) if self.files else 0
+            }
+
+
+class Prefetcher:
+    # delay: how long a selection has to stay put before anything is fetched,
+    # so scrolling through the version list does not start a download per row
+    def __init__(self, minecraft_directory, engine, manifest_cache=None, mirror=None, installed_versions=None,
+                 delay=0.75):
+        self.minecraft_directory = minecraft_directory
+        self.engine = engine
+        self.manifest_cache = manifest_cache
+        self.mirror = mirror
+        self.installed_versions = installed_versions
+        self.delay = delay
+        self.history_path = join(cache_directory(minecraft_directory), 'prefetch_history.json')
+
+        self.lock = threading.Lock()
+        self.session = None
+        self.timer = None
+        # Versions Play was pressed for, their directory belongs to the install now
+        self.launched = set()
+
+    def select(self, version_id):
+        with self.lock:
+            if self.session is not None and self.session.version_id == version_id:
+                return
+            self.cancel_locked()
+            if not version_id:
+                return
+            session = self.session = PrefetchSession(version_id)
+            self.timer = threading.Timer(self.delay, self.run, args=(session,))
+            self.timer.daemon = True
+            self.timer.start()
+
+    def cancel_locked(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.session is not None:
+            self.session.cancel()
+            self.session = None
+
+    def cancel(self):
+        with self.lock:
+            self.cancel_locked()
+
+    def run(self, session):
+        index = self.engine.index
+        if index is not None and index.is_version_complete(session.version_id):
+            session.state = 'complete'
+            return
+        session.state = 'planning'
+        session.created_directory = not isdir(self.version_directory(session.version_id))
+        try:
+            plan = InstallPlanner(self.minecraft_directory, self.engine, self.manifest_cache,
+                                  mirror=self.mirror).plan(session.version_id)
+        except Exception:
+            session.state = 'failed'
+            self.discard(session)
+            return
+        if self.installed_versions is not None and self.installed_versions.get(session.version_id) is None:
+            # Listed as incomplete while its files arrive, so they are not orphans to the GC
+            self.installed_versions.record_install_started(session.version_id)
+            session.recorded = True
+
+        jobs = plan.critical_jobs
+        with self.lock:
+            if session.cancelled:
+                self.discard_locked(session)
+                return
+            with session.lock:
+                session.files = len(jobs)
+                session.bytes = sum(job.size for job in jobs)
+            session.state = 'downloading'
+            session.batch = self.engine.submit(jobs, session.callback(), status='Prefetching', background=True)
+
+        def done(batch):
+            if not batch.cancelled:
+                session.state = 'failed' if batch.errors else 'done'
+            if index is not None:
+                index.save()
+            if (batch.cancelled or batch.errors) and not session.claimed and session.bytes_fetched == 0:
+                self.discard(session)
+
+        session.batch.add_done_callback(done)
+
+    def claim(self, version_id):
+        # Called when Play is pressed. Returns how far the prefetch got for this
+        # version (None if it was not the one prefetched) and stops it; the install
+        # takes over whatever is left on the main download pool.
+        with self.lock:
+            session = self.session
+            if session is None or session.version_id != version_id:
+                self.cancel_locked()
+                return None
+            # Taken before cancelling, skipped jobs count as done in the batch
+            report = session.report()
+            session.claimed = True
+            self.launched.add(version_id)
+            self.cancel_locked()
+        self.record(report)
+        return report
+
+    def version_directory(self, version_id):
+        return join(self.minecraft_directory, 'versions', version_id)
+
+    def discard(self, session):
+        with self.lock:
+            self.discard_locked(session)
+
+    def discard_locked(self, session):
+        # Drops the index entry and version JSON a prefetch left behind without
+        # downloading any file, unless the version has been selected again or launched
+        current = self.session
+        if session.claimed or session.version_id in self.launched or \
+                (current is not None and current is not session and current.version_id == session.version_id):
+            return
+        if session.recorded and self.installed_versions is not None:
+            self.installed_versions.remove(session.version_id)
+            session.recorded = False
+        if session.created_directory:
+            shutil.rmtree(self.version_directory(session.version_id), ignore_errors=True)
+            session.created_directory = False
+
+    def record(self, report):
+        history = read_json(self.history_path, [])
+        history.append(dict(report, at=int(time.time())))
+        write_json_atomic(self.history_path, history[-MAX_HISTORY:])
+
+    def history(self):
+        return read_json(self.history_path, [])
@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import deque
+
+RATE_WINDOW = 3.0
+
+
+def format_eta(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f'{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}'
+    return f'{seconds // 60}:{seconds % 60:02d}'
+
+
+class ProgressAggregator:
+    # Merges setStatus/setProgress/setMax callbacks from any thread and hands
+    # at most `rate` updates per second to emit(progress, maximum, label, stats).
+    # A status change is a new phase and is emitted immediately.
+    def __init__(self, emit, rate=30, clock=time.monotonic):
+        self.emit = emit
+        self.interval = 1.0 / rate
+        self.clock = clock
+
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.thread = None
+        self.running = False
+
+        self.progress = 0
+        self.maximum = 0
+        self.label = ''
+        self.bytes = 0
+        self.dirty = False
+        self.samples = deque()
+
+    def callback(self):
+        return {
+            'setStatus': self.set_status,
+            'setProgress': self.set_progress,
+            'setMax': self.set_max,
+            'addBytes': self.add_bytes
+        }
+
+    def set_status(self, label):
+        with self.lock:
+            if label == self.label:
+                return
+            self.label = label
+            self.reset_rate()
+            self.dirty = True
+        self.flush()
+
+    def set_progress(self, value):
+        with self.lock:
+            self.progress = value
+            self.dirty = True
+
+    def set_max(self, value):
+        with self.lock:
+            if value != self.maximum:
+                self.reset_rate()
+            self.maximum = value
+            self.dirty = True
+
+    def add_bytes(self, value):
+        with self.lock:
+            self.bytes += value
+
+    def reset_rate(self):
+        self.samples.clear()
+        self.bytes = 0
+
+    def stats(self, now):
+        # Rates over the last RATE_WINDOW seconds, called with the lock held
+        self.samples.append((now, self.progress, self.bytes))
+        while len(self.samples) > 2 and now - self.samples[0][0] > RATE_WINDOW:
+            self.samples.popleft()
+
+        start, start_progress, start_bytes = self.samples[0]
+        elapsed = now - start
+        if elapsed <= 0 or self.progress <= start_progress:
+            return ''
+
+        files_rate = (self.progress - start_progress) / elapsed
+        bytes_rate = (self.bytes - start_bytes) / elapsed
+        text = f'{files_rate:.0f} files/s'
+        if bytes_rate > 0:
+            text += f', {bytes_rate / 1e6:.1f} MB/s'
+        if self.maximum > self.progress:
+            text += f', ETA {format_eta((self.maximum - self.progress) / files_rate)}'
+        return text
+
+    def flush(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            update = (self.progress, self.maximum, self.label, self.stats(self.clock()))
+        self.emit(*update)
+
+    def run(self):
+        with self.lock:
+            while self.running:
+                self.condition.wait(self.interval)
+                if self.dirty:
+                    self.lock.release()
+                    try:
+                        self.flush()
+                    finally:
+                        self.lock.acquire()
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            self.progress = self.maximum = 0
+            self.label = ''
+            self.reset_rate()
+        self.thread = threading.Thread(target=self.run, name='progress', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
@@ -0,0 +1,66 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from DynamoLauncher_trace import record
+
+
+class StartupPipeline:
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.tasks = []
+        self.results = {}
+        self.errors = {}
+        self.phases = []
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def add(self, name, func, weight=1):
+        self.tasks.append((name, func, weight))
+
+    def mark(self, name, start, end=None):
+        # Phases are stored as offsets from pipeline creation so they line up
+        # with the splash and window phases recorded by main()
+        if end is None:
+            end = time.perf_counter()
+        record(name, start, end, category='startup')
+        with self.lock:
+            self.phases.append((name, start - self.origin, end - self.origin))
+
+    def run_task(self, name, func):
+        start = time.perf_counter()
+        try:
+            return func()
+        finally:
+            self.mark(name, start)
+
+    def run(self, on_progress=None):
+        total = sum(weight for _, _, weight in self.tasks)
+        done = 0
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='startup') as executor:
+            futures = {
+                executor.submit(self.run_task, name, func): (name, weight)
+                for name, func, weight in self.tasks
+            }
+            for future in as_completed(futures):
+                name, weight = futures[future]
+                try:
+                    self.results[name] = future.result()
+                except Exception as e:
+                    self.errors[name] = e
+                done += weight
+                if on_progress is not None:
+                    on_progress(done, total, name)
+
+        self.mark('warm-up', start)
+        return self.results
+
+    def report(self):
+        lines = [f"{'phase':<24}{'start ms':>10}{'end ms':>10}{'took ms':>10}"]
+        for name, start, end in sorted(self.phases, key=lambda phase: phase[1]):
+            lines.append(f'{name:<24}{start * 1000:>10.1f}{end * 1000:>10.1f}{(end - start) * 1000:>10.1f}')
+        for name, error in self.errors.items():
+            lines.append(f'{name}: failed ({error})')
+        return '\n'.join(lines)
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import shutil
+import threading
+from os.path import join, abspath, dirname, isfile, samefile, getsize
+
+from DynamoLauncher_common import read_json, write_json_atomic
+from DynamoLauncher_download import file_sha1
+from DynamoLauncher_verify import VerifyIndex
+
+FICLONE = 0x40049409
+
+
+def reflink(source, destination):
+    import fcntl
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def link_or_copy(source, destination):
+    # Hardlink when source and destination share a filesystem, reflink on
+    # copy-on-write filesystems, plain copy otherwise
+    try:
+        os.link(source, destination)
+        return 'link'
+    except OSError:
+        pass
+    try:
+        reflink(source, destination)
+        return 'reflink'
+    except (ImportError, OSError):
+        if isfile(destination):
+            os.remove(destination)
+    shutil.copyfile(source, destination)
+    return 'copy'
+
+
+class ContentStore:
+    # Blobs are stored once by sha1 and materialized into every launcher root,
+    # each root records which blobs it uses so sharing can be reported
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.roots = None
+        # (size, mtime, sha1) of blobs known to be intact, kept in <store>/launcher_cache/
+        self.index = VerifyIndex(path)
+
+    def blob_path(self, sha1):
+        return join(self.path, 'objects', sha1[:2], sha1)
+
+    def has(self, sha1):
+        return isfile(self.blob_path(sha1))
+
+    def place(self, source, destination):
+        os.makedirs(dirname(destination), exist_ok=True)
+        tmp_path = f'{destination}.{threading.get_ident()}.tmp'
+        try:
+            link_or_copy(source, tmp_path)
+            os.replace(tmp_path, destination)
+        finally:
+            if isfile(tmp_path):
+                os.remove(tmp_path)
+
+    def verified_blob(self, sha1, size=0):
+        # Returns the blob path once its size and stat match what was verified, hashing
+        # it again otherwise. A damaged blob is dropped so it is not linked anywhere.
+        blob = self.blob_path(sha1)
+        try:
+            if size and getsize(blob) != size:
+                self.discard(blob)
+                return None
+            if self.index.is_verified(blob, sha1):
+                return blob
+            if file_sha1(blob) != sha1:
+                self.discard(blob)
+                return None
+        except OSError:
+            return None
+        self.index.record(blob, sha1)
+        return blob
+
+    def discard(self, blob):
+        self.index.forget(blob)
+        try:
+            os.remove(blob)
+        except OSError:
+            pass
+
+    def materialize(self, sha1, destination, size=0):
+        # Returns False when the blob is missing or damaged, the caller fetches the file instead
+        blob = self.verified_blob(sha1, size)
+        if blob is None:
+            return False
+        if isfile(destination) and samefile(blob, destination):
+            return True
+        self.place(blob, destination)
+        return True
+
+    def ingest(self, path, sha1):
+        # Only called with files whose sha1 has already been verified
+        blob = self.blob_path(sha1)
+        if not isfile(blob):
+            self.place(path, blob)
+            self.index.record(blob, sha1)
+
+    def save(self):
+        self.index.save()
+
+    def root_file(self, root):
+        key = hashlib.sha1(abspath(root).encode()).hexdigest()
+        return join(self.path, 'roots', f'{key}.json')
+
+    def load_roots(self):
+        with self.lock:
+            if self.roots is None:
+                self.roots = {}
+                folder = join(self.path, 'roots')
+                if os.path.isdir(folder):
+                    for name in os.listdir(folder):
+                        data = read_json(join(folder, name))
+                        if data is not None:
+                            self.roots[data['root']] = data['blobs']
+            return self.roots
+
+    def set_refs(self, root, blobs):
+        # blobs maps sha1 -> size for everything the root currently uses
+        root = abspath(root)
+        self.load_roots()
+        with self.lock:
+            self.roots[root] = dict(blobs)
+            write_json_atomic(self.root_file(root), {'root': root, 'blobs': self.roots[root]})
+
+    def add_refs(self, root, blobs):
+        root = abspath(root)
+        current = dict(self.load_roots().get(root, {}))
+        current.update(blobs)
+        self.set_refs(root, current)
+
+    def remove_refs(self, root, sha1s):
+        root = abspath(root)
+        current = dict(self.load_roots().get(root, {}))
+        for sha1 in sha1s:
+            current.pop(sha1, None)
+        self.set_refs(root, current)
+
+    def refcount(self, sha1):
+        return sum(1 for blobs in self.load_roots().values() if sha1 in blobs)
+
+    def refcounts(self):
+        counts = {}
+        for blobs in self.load_roots().values():
+            for sha1 in blobs:
+                counts[sha1] = counts.get(sha1, 0) + 1
+        return counts
+
+    def usage(self, root):
+        # exclusive: freed if this root went away, attributed: shared blobs split evenly
+        counts = self.refcounts()
+        blobs = self.load_roots().get(abspath(root), {})
+        report = {'files': len(blobs), 'bytes': 0, 'exclusive_bytes': 0, 'shared_bytes': 0, 'attributed_bytes': 0}
+        for sha1, size in blobs.items():
+            report['bytes'] += size
+            if counts[sha1] > 1:
+                report['shared_bytes'] += size
+            else:
+                report['exclusive_bytes'] += size
+            report['attributed_bytes'] += size // counts[sha1]
+        return report
+
+    def unreferenced(self):
+        counts = self.refcounts()
+        folder = join(self.path, 'objects')
+        if not os.path.isdir(folder):
+            return
+        for prefix in os.scandir(folder):
+            for entry in os.scandir(prefix.path):
+                if entry.name not in counts:
+                    yield entry.path
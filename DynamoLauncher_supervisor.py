@@ -0,0 +1,300 @@
+# Runs a game process with its output captured: stdout and stderr are merged
+# into one pipe read by one thread, kept in a bounded ring buffer and written
+# to rotating per-session log files. Resource samples are taken by whoever
+# calls sample() (the launch manager's reaper), so a session costs one thread.
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import deque
+from os.path import join, isfile
+
+from DynamoLauncher_common import cache_directory, write_json_atomic
+from DynamoLauncher_progress import format_eta
+from DynamoLauncher_trace import span
+
+MAX_LINE = 8192
+
+# Java 9+ unified logging: "[1.234s][info][gc] GC(3) Pause Young (Normal) ... 3.456ms"
+GC_PAUSE_MS = re.compile(rb'Pause.*?(\d+(?:\.\d+)?)ms')
+# Java 8: "[GC (Allocation Failure)  24M->8M(256M), 0.0034560 secs]"
+GC_PAUSE_SECS = re.compile(rb'\[(?:Full )?GC.*?(\d+\.\d+) secs\]')
+
+# Log lines the game prints once its window exists (LWJGL 3 and LWJGL 2 versions)
+WINDOW_MARKERS = (b'Backend library: LWJGL', b'LWJGL Version: ')
+
+
+def sessions_directory(minecraft_directory):
+    return join(cache_directory(minecraft_directory), 'sessions')
+
+
+def parse_gc_pause(line):
+    # Pause in milliseconds, or None when the line is not a GC pause
+    if b'GC' not in line:
+        return None
+    match = GC_PAUSE_MS.search(line)
+    if match is not None:
+        return float(match.group(1))
+    match = GC_PAUSE_SECS.search(line)
+    if match is not None:
+        return float(match.group(1)) * 1000
+    return None
+
+
+class RotatingLog:
+    # session.log, session.log.1 ... session.log.<backups>; the oldest is dropped
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, backups=3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, 'ab')
+        self.size = self.file.tell()
+
+    def write(self, line):
+        if self.size + len(line) > self.max_bytes and self.size:
+            self.rotate()
+        self.file.write(line)
+        self.size += len(line)
+
+    def rotate(self):
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if isfile(f'{self.path}.{i}'):
+                os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+        if self.backups:
+            os.replace(self.path, f'{self.path}.1')
+        self.file = open(self.path, 'wb')
+        self.size = 0
+
+    def close(self):
+        self.file.close()
+
+
+class ProcessSampler:
+    # CPU%, RSS and thread count of one pid from /proc, or psutil where there is no /proc
+    def __init__(self, pid):
+        self.pid = pid
+        self.last = None
+        self.process = None
+        if not os.path.isdir(f'/proc/{pid}'):
+            try:
+                import psutil
+                self.process = psutil.Process(pid)
+            except Exception:
+                pass
+
+    @property
+    def available(self):
+        return self.process is not None or os.path.isdir(f'/proc/{self.pid}')
+
+    def read(self):
+        # Returns (cpu seconds, rss bytes, threads)
+        if self.process is not None:
+            times = self.process.cpu_times()
+            return times.user + times.system, self.process.memory_info().rss, self.process.num_threads()
+        with open(f'/proc/{self.pid}/stat', 'rb') as f:
+            # Fields after the parenthesised command name, which may contain spaces
+            fields = f.read().rsplit(b')', 1)[1].split()
+        ticks = os.sysconf('SC_CLK_TCK')
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        return (int(fields[11]) + int(fields[12])) / ticks, int(fields[21]) * page_size, int(fields[17])
+
+    def sample(self, now):
+        # Returns (cpu percent, rss bytes, threads); cpu is None on the first sample
+        try:
+            cpu_seconds, rss, threads = self.read()
+        except Exception:
+            return None
+        cpu = None
+        if self.last is not None and now > self.last[0]:
+            cpu = (cpu_seconds - self.last[1]) / (now - self.last[0]) * 100
+        self.last = (now, cpu_seconds)
+        return cpu, rss, threads
+
+
+class GameSupervisor:
+    def __init__(self, command, log_path, sample_interval=5.0, ring_lines=2000, max_log_bytes=5 * 1024 * 1024,
+                 log_backups=3, gc_logging=True, creationflags=0, markers=None):
+        if gc_logging and len(command) > 1:
+            # -verbose:gc is understood by every Java version and prints one line per pause
+            command = [command[0], '-verbose:gc'] + list(command[1:])
+        self.command = command
+        self.log_path = log_path
+        self.sample_interval = sample_interval
+        self.max_log_bytes = max_log_bytes
+        self.log_backups = log_backups
+        self.creationflags = creationflags
+        # name -> byte strings; the first line containing any of them timestamps the marker
+        self.pending_markers = dict(markers if markers is not None else {'window': WINDOW_MARKERS})
+        self.markers = {}
+
+        self.lines = deque(maxlen=ring_lines)
+        self.samples = deque(maxlen=120)
+        self.lock = threading.Lock()
+        self.process = None
+        self.reader = None
+        self.sampler = None
+        self.next_sample = 0
+
+        self.started_at = None
+        self.first_output_at = None
+        self.exited_at = None
+        self.line_count = 0
+        self.log_bytes = 0
+        self.peak_rss = 0
+        self.peak_threads = 0
+        self.cpu_total = 0.0
+        self.cpu_samples = 0
+        self.peak_cpu = 0.0
+        self.gc_pauses = 0
+        self.gc_pause_total = 0.0
+        self.gc_pause_max = 0.0
+
+    def start(self):
+        self.log = RotatingLog(self.log_path, self.max_log_bytes, self.log_backups)
+        with span('launch.spawn', java=self.command[0]):
+            self.process = subprocess.Popen(
+                self.command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL,
+                creationflags=self.creationflags
+            )
+        self.started_at = time.time()
+        self.sampler = ProcessSampler(self.process.pid)
+        self.reader = threading.Thread(target=self.read_output, name=f'game-output-{self.process.pid}', daemon=True)
+        self.reader.start()
+        return self
+
+    def read_output(self):
+        stream = self.process.stdout
+        try:
+            for line in iter(lambda: stream.readline(MAX_LINE), b''):
+                pause = parse_gc_pause(line)
+                with self.lock:
+                    if self.first_output_at is None:
+                        self.first_output_at = time.time()
+                    if self.pending_markers:
+                        self.match_markers(line)
+                    self.lines.append(line)
+                    self.line_count += 1
+                    self.log_bytes += len(line)
+                    self.log.write(line)
+                    if pause is not None:
+                        self.gc_pauses += 1
+                        self.gc_pause_total += pause
+                        self.gc_pause_max = max(self.gc_pause_max, pause)
+        except (OSError, ValueError):
+            pass
+        finally:
+            stream.close()
+
+    def match_markers(self, line):
+        for name, needles in list(self.pending_markers.items()):
+            if any(needle in line for needle in needles):
+                self.markers[name] = time.time()
+                del self.pending_markers[name]
+
+    def tail(self, count=50):
+        with self.lock:
+            lines = list(self.lines)[-count:]
+        return [line.decode('utf-8', 'replace').rstrip('\r\n') for line in lines]
+
+    def sample(self, now=None):
+        # Cheap to call often, only reads /proc once per sample_interval
+        now = time.monotonic() if now is None else now
+        if now < self.next_sample or self.exited_at is not None:
+            return None
+        self.next_sample = now + self.sample_interval
+        sample = self.sampler.sample(now)
+        if sample is None:
+            return None
+        cpu, rss, threads = sample
+        with self.lock:
+            self.samples.append((time.time(), cpu, rss, threads))
+            self.peak_rss = max(self.peak_rss, rss)
+            self.peak_threads = max(self.peak_threads, threads)
+            if cpu is not None:
+                self.cpu_total += cpu
+                self.cpu_samples += 1
+                self.peak_cpu = max(self.peak_cpu, cpu)
+        return sample
+
+    def poll(self):
+        return self.process.poll()
+
+    def finish(self, timeout=2):
+        # Called once the process has exited: drains the pipe and closes the log
+        if self.exited_at is None:
+            self.exited_at = time.time()
+        self.reader.join(timeout)
+        with self.lock:
+            self.log.close()
+        summary = self.summary()
+        write_json_atomic(f'{self.log_path}.summary.json', summary)
+        return summary
+
+    def wait(self):
+        while self.poll() is None:
+            self.sample()
+            time.sleep(min(self.sample_interval, 1.0))
+        return self.process.returncode
+
+    def summary(self):
+        with self.lock:
+            end = self.exited_at or time.time()
+            return {
+                'returncode': self.process.returncode,
+                'session_seconds': round(end - self.started_at, 1),
+                'first_output_seconds': round(self.first_output_at - self.started_at, 3)
+                if self.first_output_at else None,
+                'markers': {name: round(at - self.started_at, 3) for name, at in self.markers.items()},
+                'peak_rss': self.peak_rss,
+                'peak_threads': self.peak_threads,
+                'avg_cpu': round(self.cpu_total / self.cpu_samples, 1) if self.cpu_samples else None,
+                'peak_cpu': round(self.peak_cpu, 1),
+                'gc_pauses': self.gc_pauses,
+                'gc_pause_total_ms': round(self.gc_pause_total, 1),
+                'gc_pause_max_ms': round(self.gc_pause_max, 1),
+                'log_lines': self.line_count,
+                'log_bytes': self.log_bytes,
+                'log': self.log_path
+            }
+
+
+def format_summary(summary):
+    text = f"played {format_eta(summary['session_seconds'])}"
+    if 'window' in summary['markers']:
+        text += f", window after {summary['markers']['window']:.1f} s"
+    if summary['peak_rss']:
+        text += f", peak {summary['peak_rss'] / 2 ** 20:.0f} MB"
+    if summary['avg_cpu'] is not None:
+        text += f", avg CPU {summary['avg_cpu']:.0f}%"
+    if summary['gc_pauses']:
+        text += f", {summary['gc_pauses']} GC pauses (max {summary['gc_pause_max_ms']:.0f} ms)"
+    return text
+
+
+def session_log_path(minecraft_directory, version_id, instance_id):
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{instance_id}-{version_id}.log"
+    return join(sessions_directory(minecraft_directory), name.replace(os.sep, '_'))
+
+
+def prune_sessions(minecraft_directory, keep=20):
+    # Keeps the newest sessions, each with its rotated logs and summary
+    directory = sessions_directory(minecraft_directory)
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    sessions = sorted(name for name in names if name.endswith('.log'))
+    for session in sessions[:-keep] if keep else sessions:
+        for name in names:
+            if name.startswith(session):
+                try:
+                    os.remove(join(directory, name))
+                except OSError:
+                    pass
+
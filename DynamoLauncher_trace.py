@@ -0,0 +1,169 @@
+# Timed spans and counters for the startup, install and launch pipeline.
+# Tracing is off until enable() is called; every helper then returns right
+# away (span() hands out one shared no-op object), so instrumented code pays
+# a global lookup and a call. Traces export as Chrome trace JSON, which opens
+# in chrome://tracing or https://ui.perfetto.dev, or as a summary table.
+import os
+import threading
+import time
+from os.path import join
+
+from DynamoLauncher_common import cache_directory, write_json_atomic
+
+tracer = None
+
+
+class Tracer:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.events = []
+        self.counters = {}
+        self.threads = {}
+
+    def thread_id(self):
+        thread = threading.current_thread()
+        tid = thread.ident
+        if tid not in self.threads:
+            self.threads[tid] = thread.name
+        return tid
+
+    def complete(self, name, category, start, end, args):
+        event = {
+            'name': name, 'cat': category, 'ph': 'X', 'pid': self.pid, 'tid': self.thread_id(),
+            'ts': round((start - self.origin) * 1e6, 1), 'dur': round((end - start) * 1e6, 1)
+        }
+        if args:
+            event['args'] = args
+        with self.lock:
+            self.events.append(event)
+
+    def count(self, name, value):
+        now = time.perf_counter()
+        with self.lock:
+            total = self.counters[name] = self.counters.get(name, 0) + value
+            self.events.append({
+                'name': name, 'ph': 'C', 'pid': self.pid, 'ts': round((now - self.origin) * 1e6, 1),
+                'args': {name: total}
+            })
+
+    def chrome_trace(self):
+        with self.lock:
+            events = list(self.events)
+            threads = dict(self.threads)
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': name}}
+                    for tid, name in threads.items()]
+        return {'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}
+
+    def summary(self):
+        # {span name: {'count', 'total_ms', 'max_ms'}} plus the final counter values
+        spans = {}
+        with self.lock:
+            for event in self.events:
+                if event['ph'] != 'X':
+                    continue
+                row = spans.setdefault(event['name'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+                row['count'] += 1
+                row['total_ms'] += event['dur'] / 1000
+                row['max_ms'] = max(row['max_ms'], event['dur'] / 1000)
+            return spans, dict(self.counters)
+
+    def report(self):
+        spans, counters = self.summary()
+        lines = [f"{'span':<28}{'count':>8}{'total ms':>12}{'mean ms':>10}{'max ms':>10}"]
+        for name, row in sorted(spans.items(), key=lambda item: -item[1]['total_ms']):
+            lines.append(f"{name:<28}{row['count']:>8}{row['total_ms']:>12.1f}"
+                         f"{row['total_ms'] / row['count']:>10.1f}{row['max_ms']:>10.1f}")
+        for name, value in sorted(counters.items()):
+            lines.append(f'{name:<28}{value:>8}')
+        return '\n'.join(lines)
+
+    def save(self, path):
+        write_json_atomic(path, self.chrome_trace())
+        return path
+
+
+class Span:
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            self.args['error'] = repr(exc)
+        self.tracer.complete(self.name, self.category, self.start, time.perf_counter(), self.args)
+        return False
+
+
+class NullSpan:
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def enable():
+    global tracer
+    if tracer is None:
+        tracer = Tracer()
+    return tracer
+
+
+def disable():
+    global tracer
+    tracer = None
+
+
+def enabled():
+    return tracer is not None
+
+
+def span(name, category='launcher', **args):
+    if tracer is None:
+        return NULL_SPAN
+    return Span(tracer, name, category, args)
+
+
+def record(name, start, end=None, category='launcher', **args):
+    # For spans that start and end on different threads, such as background downloads.
+    # start and end come from time.perf_counter().
+    if tracer is not None:
+        tracer.complete(name, category, start, time.perf_counter() if end is None else end, args)
+
+
+def count(name, value=1):
+    if tracer is not None:
+        tracer.count(name, value)
+
+
+def report():
+    return tracer.report() if tracer is not None else ''
+
+
+def traces_directory(minecraft_directory):
+    return join(cache_directory(minecraft_directory), 'traces')
+
+
+def save_trace(minecraft_directory, label):
+    # Writes the trace so far to launcher_cache/traces/, returns the path or None when tracing is off
+    if tracer is None:
+        return None
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{label}.json"
+    return tracer.save(join(traces_directory(minecraft_directory), name))
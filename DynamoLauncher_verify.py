@@ -0,0 +1,86 @@
+import os
+import threading
+from os.path import join, abspath
+
+from DynamoLauncher_common import cache_directory, read_json, write_json_atomic
+
+
+class VerifyIndex:
+    # Remembers (size, mtime, sha1) of every file we have hashed so unchanged
+    # files are trusted from a stat() instead of being read again
+    def __init__(self, minecraft_directory):
+        self.path = join(cache_directory(minecraft_directory), 'verify_index.json')
+        self.lock = threading.Lock()
+        self.files = None
+        self.versions = None
+        self.dirty = False
+
+    def load(self):
+        with self.lock:
+            if self.files is None:
+                data = read_json(self.path, {})
+                self.files = data.get('files', {})
+                self.versions = data.get('versions', {})
+
+    def save(self):
+        self.load()
+        with self.lock:
+            if not self.dirty:
+                return
+            write_json_atomic(self.path, {'files': self.files, 'versions': self.versions})
+            self.dirty = False
+
+    def is_verified(self, path, sha1):
+        self.load()
+        entry = self.files.get(abspath(path))
+        if entry is None or (sha1 is not None and entry[2] != sha1):
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns
+
+    def record(self, path, sha1):
+        self.load()
+        stat = os.stat(path)
+        with self.lock:
+            self.files[abspath(path)] = [stat.st_size, stat.st_mtime_ns, sha1]
+            self.dirty = True
+
+    def forget(self, path):
+        self.load()
+        with self.lock:
+            if self.files.pop(abspath(path), None) is not None:
+                self.dirty = True
+
+    def fingerprint(self, paths):
+        result = []
+        for path in paths:
+            stat = os.stat(path)
+            result.append([abspath(path), stat.st_size, stat.st_mtime_ns])
+        return result
+
+    def mark_version_complete(self, version_id, json_paths):
+        self.load()
+        fingerprint = self.fingerprint(json_paths)
+        with self.lock:
+            self.versions[version_id] = fingerprint
+            self.dirty = True
+
+    def forget_version(self, version_id):
+        self.load()
+        with self.lock:
+            if self.versions.pop(version_id, None) is not None:
+                self.dirty = True
+
+    def is_version_complete(self, version_id):
+        # Only the version JSON chain is stat'ed, no library or asset is touched
+        self.load()
+        fingerprint = self.versions.get(version_id)
+        if fingerprint is None:
+            return False
+        try:
+            return self.fingerprint(path for path, _, _ in fingerprint) == fingerprint
+        except OSError:
+            return False
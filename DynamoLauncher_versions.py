@@ -0,0 +1,211 @@
+import os
+import re
+import threading
+import time
+from os.path import join, isdir, isfile
+
+from DynamoLauncher_common import cache_directory, read_json, write_json_atomic
+from DynamoLauncher_install import InstallPlanner
+from DynamoLauncher_verify import VerifyIndex
+
+# 1.20.4, 1.20-pre1, 1.14.4-rc2, 1.14 Pre-Release 3, 1.RV-Pre1 is left to the fallback
+RELEASE_PATTERN = re.compile(
+    r'^(\d+(?:\.\d+)*)(?:(?:-| )(pre|rc|pre-release |release candidate )-?(\d+))?$', re.IGNORECASE)
+# 23w45a
+SNAPSHOT_PATTERN = re.compile(r'^(\d\d)w(\d\d)([a-z~]?)$')
+# b1.7.3, a1.0.4_01, c0.0.13a, inf-20100618, rd-132211
+OLD_PATTERN = re.compile(r'^(rd-|c|inf-|a|b)(\d+(?:[._]\d+)*)([a-z]?)(?:[-_].*)?$')
+
+OLD_STAGES = {'rd-': 0, 'c': 1, 'inf-': 2, 'a': 3, 'b': 4}
+PRE_STAGES = {'pre': 0, 'pre-release ': 0, 'rc': 1, 'release candidate ': 1}
+FINAL_STAGE = 2
+
+
+def version_key(version_id):
+    # Sort key for version ids when no releaseTime is at hand: unknown ids (modded
+    # profiles) first by name, then old alpha/beta builds, snapshots, and releases
+    # with their pre-releases and release candidates just before them
+    match = RELEASE_PATTERN.match(version_id)
+    if match is not None:
+        numbers = tuple(int(part) for part in match.group(1).split('.'))
+        if match.group(2) is None:
+            return (3, numbers, FINAL_STAGE, 0, version_id)
+        return (3, numbers, PRE_STAGES[match.group(2).lower()], int(match.group(3)), version_id)
+
+    match = SNAPSHOT_PATTERN.match(version_id)
+    if match is not None:
+        return (2, (int(match.group(1)), int(match.group(2))), 0, ord(match.group(3) or 'a'), version_id)
+
+    match = OLD_PATTERN.match(version_id)
+    if match is not None:
+        numbers = tuple(int(part) for part in re.split('[._]', match.group(2)))
+        return (1, (OLD_STAGES[match.group(1)],) + numbers, 0, ord(match.group(3) or ' '), version_id)
+
+    return (0, (), 0, 0, version_id.lower())
+
+
+class InstalledVersions:
+    # What versions/ holds as far as the launcher knows: completeness, size and
+    # last-played time per version. Kept current from install and launch events,
+    # versions/ itself is only listed once, when the index does not exist yet.
+    def __init__(self, minecraft_directory, on_change=None):
+        self.minecraft_directory = minecraft_directory
+        self.versions_directory = join(minecraft_directory, 'versions')
+        self.path = join(cache_directory(minecraft_directory), 'installed_versions.json')
+        self.on_change = on_change or (lambda: None)
+        self.lock = threading.Lock()
+        self.versions = None
+
+    def load(self):
+        with self.lock:
+            if self.versions is not None:
+                return self
+            data = read_json(self.path)
+            if data is not None:
+                self.versions = data.get('versions', {})
+                return self
+            self.versions = {}
+            verify_index = VerifyIndex(self.minecraft_directory)
+            for version_id in self.list_directory():
+                self.versions[version_id] = self.imported_entry(version_id, verify_index)
+            self.save()
+        return self
+
+    def list_directory(self):
+        try:
+            return [name for name in os.listdir(self.versions_directory)
+                    if isdir(join(self.versions_directory, name))]
+        except FileNotFoundError:
+            return []
+
+    def imported_entry(self, version_id, verify_index):
+        # A version installed before the index existed or by another tool.
+        # verify_index is shared by the caller, it is read from disk once per pass
+        directory = join(self.versions_directory, version_id)
+        complete = verify_index.is_version_complete(version_id) or (
+            isfile(join(directory, f'{version_id}.json')) and isfile(join(directory, f'{version_id}.jar')))
+        return {'complete': complete, 'size': self.version_size(version_id), 'installed_at': None,
+                'last_played': None}
+
+    def version_size(self, version_id):
+        # Bytes the version uses, from the sizes its JSONs and asset index declare;
+        # None while part of them is missing. Reads no file below libraries/ or assets/objects.
+        try:
+            return InstallPlanner(self.minecraft_directory, None).plan(version_id).total_size
+        except Exception:
+            return None
+
+    def save(self):
+        # Called with the lock held
+        write_json_atomic(self.path, {'versions': self.versions})
+
+    def update(self, version_id, **fields):
+        self.load()
+        with self.lock:
+            entry = self.versions.setdefault(
+                version_id, {'complete': False, 'size': None, 'installed_at': None, 'last_played': None})
+            if all(entry.get(name) == value for name, value in fields.items()):
+                return
+            entry.update(fields)
+            self.save()
+        self.on_change()
+
+    def remove(self, version_id):
+        self.load()
+        with self.lock:
+            if self.versions.pop(version_id, None) is None:
+                return
+            self.save()
+        self.on_change()
+
+    def get(self, version_id):
+        self.load()
+        with self.lock:
+            entry = self.versions.get(version_id)
+            return dict(entry) if entry is not None else None
+
+    def entries(self):
+        self.load()
+        with self.lock:
+            return {version_id: dict(entry) for version_id, entry in self.versions.items()}
+
+    def complete_versions(self):
+        return [version_id for version_id, entry in self.entries().items() if entry['complete']]
+
+    def record_install_started(self, version_id):
+        self.load()
+        with self.lock:
+            known = version_id in self.versions
+        if not known:
+            self.update(version_id, complete=False)
+
+    def record_install(self, version_id, plan):
+        # plan is what install_version returned, None when the version was already complete
+        if plan is None:
+            entry = self.get(version_id)
+            if entry is None or entry['size'] is None:
+                self.update(version_id, complete=True, size=self.version_size(version_id))
+            else:
+                self.update(version_id, complete=True)
+            return
+        self.update(version_id, size=plan.total_size, installed_at=int(time.time()), complete=plan.background is None)
+
+        def background_done(batch):
+            # Inherited versions are installed along with the one that was asked for
+            complete = not batch.errors and not batch.cancelled
+            for chain_version_id in plan.chain:
+                self.update(chain_version_id, complete=complete)
+
+        if plan.background is not None:
+            plan.background.add_done_callback(background_done)
+
+    def record_played(self, version_id):
+        self.update(version_id, last_played=int(time.time()))
+
+    def sync_directory(self):
+        # For file watcher notifications: one listdir of versions/, nothing below it
+        self.load()
+        present = set(self.list_directory())
+        with self.lock:
+            added = present - set(self.versions)
+            # Incomplete entries may be installs whose directory is not created yet
+            removed = {version_id for version_id in set(self.versions) - present
+                       if self.versions[version_id]['complete']}
+            if not added and not removed:
+                return False
+        # New versions are read without the lock, installs keep updating their entries meanwhile
+        verify_index = VerifyIndex(self.minecraft_directory)
+        imported = {version_id: self.imported_entry(version_id, verify_index) for version_id in added}
+        with self.lock:
+            for version_id, entry in imported.items():
+                self.versions.setdefault(version_id, entry)
+            for version_id in removed:
+                self.versions.pop(version_id, None)
+            self.save()
+        self.on_change()
+        return True
+
+
+class VersionIndex:
+    # Manifest entries parsed and sorted once, newest first. While the search text
+    # only grows, filtering walks the previous result instead of every version.
+    def __init__(self, versions):
+        self.versions = sorted(versions, key=lambda version: (version.get('releaseTime', ''), version_key(version['id'])),
+                               reverse=True)
+        self.search_keys = [version['id'].lower() for version in self.versions]
+        self.last = None
+
+    def __len__(self):
+        return len(self.versions)
+
+    def filter(self, types=None, text=''):
+        # Returns row numbers into self.versions
+        text = text.strip().lower()
+        types = frozenset(types) if types is not None else None
+        candidates = range(len(self.versions))
+        if self.last is not None and self.last[0] == types and text.startswith(self.last[1]):
+            candidates = self.last[2]
+        rows = [row for row in candidates
+                if (types is None or self.versions[row]['type'] in types) and text in self.search_keys[row]]
+        self.last = (types, text, rows)
+        return rows